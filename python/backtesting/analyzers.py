@@ -0,0 +1,51 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+EQUITY_COLUMNS = ('close', 'cash', 'portfolio', 'position_size', 'traded_value')
+
+
+class EquityCurve(bt.Analyzer):
+    '''
+    Records the close price, broker cash, portfolio value, position size and traded value of every bar into an array
+    preallocated to the length of the data, and the net profit of every closed trade. get_analysis returns the bars
+    as a dataframe.
+    '''
+
+    def start(self):
+        capacity = max(self.strategy.data.buflen(), 1)
+        self._length = 0
+        self._stock_datetime = np.empty(capacity, dtype='datetime64[us]')
+        self._equity = np.empty((capacity, len(EQUITY_COLUMNS)))
+        self._traded_value = 0.0
+        self.trade_pnls = []
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        self._current = (cash, value)
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self._traded_value += abs(order.executed.size) * order.executed.price
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.trade_pnls.append(trade.pnlcomm)
+
+    def next(self):
+        if self._length == len(self._equity):
+            # Only for data that was not preloaded
+            capacity = 2 * len(self._equity)
+            self._stock_datetime = np.resize(self._stock_datetime, capacity)
+            self._equity = np.resize(self._equity, (capacity, len(EQUITY_COLUMNS)))
+
+        cash, value = self._current
+        self._stock_datetime[self._length] = self.strategy.data.datetime.datetime(0)
+        self._equity[self._length] = (
+            self.strategy.data.close[0], cash, value, self.strategy.position.size, self._traded_value)
+        self._traded_value = 0.0
+        self._length += 1
+
+    def get_analysis(self):
+        equity_df = pd.DataFrame(self._equity[:self._length], columns=list(EQUITY_COLUMNS))
+        equity_df.insert(0, 'stock_datetime', self._stock_datetime[:self._length])
+        return equity_df
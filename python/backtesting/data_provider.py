@@ -0,0 +1,105 @@
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from urllib.parse import quote
+
+import pandas as pd
+import sqlalchemy as sa
+
+from backtesting.custom_datafeed import PandasData
+from common.etl_watermarks import read_high_water_mark
+from schema.data_model import ActualisedTable
+
+ACTUALISED_COLUMNS = [
+    ActualisedTable.stock_datetime, ActualisedTable.symbol, ActualisedTable.open, ActualisedTable.high,
+    ActualisedTable.low, ActualisedTable.close, ActualisedTable.adj_close, ActualisedTable.volume,
+    ActualisedTable.future_close
+]
+
+
+class BacktestDataProvider:
+    '''
+    Loads the actualised data of many (symbol, model_id) pairs with a single query and serves it to backtest runs
+    without re-querying.
+
+    Loaded frames are kept in an in memory LRU of max_entries frames and, when cache_dir is set, as one Parquet file
+    per pair under a directory named after the actualised table high water mark. A refresh of the actualised table
+    moves the high water mark, which invalidates the files cached for the previous one.
+    '''
+
+    def __init__(self, con, cache_dir=None, max_entries=64):
+        self.con = con
+        self.max_entries = max_entries
+        self._frames = OrderedDict()
+        self._logger = logging.getLogger(__name__)
+
+        high_water_mark = read_high_water_mark(con, ActualisedTable.__tablename__)
+        self.cache_dir = None
+        if cache_dir:
+            version = high_water_mark.strftime('%Y%m%d%H%M%S') if high_water_mark else 'initial'
+            self.cache_dir = os.path.join(cache_dir, version)
+            self._remove_stale_versions(cache_dir, version)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _remove_stale_versions(cache_dir, version):
+        if not os.path.isdir(cache_dir):
+            return
+        for name in os.listdir(cache_dir):
+            if name != version:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+    def _file_path(self, symbol, model_id):
+        # Symbols are escaped for the file name, screener symbols such as BF/B contain a slash
+        return os.path.join(self.cache_dir, '{}_{}.parquet'.format(quote(symbol, safe=''), model_id))
+
+    def _put(self, pair, df):
+        self._frames[pair] = df
+        self._frames.move_to_end(pair)
+        while len(self._frames) > self.max_entries:
+            self._frames.popitem(last=False)
+
+    def _read_cached(self, pair):
+        if pair in self._frames:
+            self._frames.move_to_end(pair)
+            return self._frames[pair]
+        if self.cache_dir and os.path.exists(self._file_path(*pair)):
+            df = pd.read_parquet(self._file_path(*pair))
+            self._put(pair, df)
+            return df
+        return None
+
+    def load(self, pairs):
+        '''
+        Makes sure the data of every (symbol, model_id) in pairs is cached, the pairs that are not are read from the
+        database in one query. Returns a dict of pair to dataframe.
+        '''
+        pairs = list(dict.fromkeys((symbol, model_id) for symbol, model_id in pairs))
+        frames = {pair: self._read_cached(pair) for pair in pairs}
+        missing = [pair for pair, df in frames.items() if df is None]
+
+        if missing:
+            self._logger.info('Reading actualised data for {} symbol/model pairs'.format(len(missing)))
+            sql_df = pd.read_sql(
+                sa.select(*ACTUALISED_COLUMNS, ActualisedTable.model_id)
+                .where(sa.tuple_(ActualisedTable.symbol, ActualisedTable.model_id).in_(missing))
+                .order_by(ActualisedTable.symbol, ActualisedTable.model_id, ActualisedTable.stock_datetime), self.con)
+
+            groups = {pair: df for pair, df in sql_df.groupby(['symbol', 'model_id'], sort=False)}
+            empty_df = sql_df.iloc[:0]
+            for pair in missing:
+                df = groups.get(pair, empty_df).drop(columns='model_id').reset_index(drop=True)
+                if self.cache_dir:
+                    df.to_parquet(self._file_path(*pair), index=False)
+                self._put(pair, df)
+                frames[pair] = df
+
+        return frames
+
+    def get(self, symbol, model_id):
+        return self.load([(symbol, model_id)])[(symbol, model_id)]
+
+    def feed(self, symbol, model_id):
+        # Feeds hold their own position, so every run gets a new one over the shared dataframe
+        return PandasData(dataname=self.get(symbol, model_id))
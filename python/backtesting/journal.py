@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class OrderRecord:
+    '''Order notification kept by the journal'''
+    __slots__ = ('stock_datetime', 'side', 'status', 'size', 'price', 'value', 'commission')
+
+    def __init__(self, stock_datetime, side, status, size, price, value, commission):
+        self.stock_datetime = stock_datetime
+        self.side = side
+        self.status = status
+        self.size = size
+        self.price = price
+        self.value = value
+        self.commission = commission
+
+
+class BacktestJournal:
+    '''
+    In memory journal of a backtest run, the equity of every bar is kept in NumPy arrays that grow by doubling and
+    the orders as OrderRecord. Nothing is written until flush is called at the end of the run.
+    '''
+
+    EQUITY_COLUMNS = ('close', 'portfolio', 'cash', 'units')
+
+    def __init__(self, capacity=1024):
+        self._length = 0
+        self._stock_datetime = np.empty(capacity, dtype='datetime64[us]')
+        self._equity = np.empty((capacity, len(self.EQUITY_COLUMNS)))
+        self.orders = []
+
+    def _grow(self):
+        capacity = max(1, 2 * len(self._equity))
+        self._stock_datetime = np.resize(self._stock_datetime, capacity)
+        self._equity = np.resize(self._equity, (capacity, len(self.EQUITY_COLUMNS)))
+
+    def record_bar(self, stock_datetime, close, portfolio, cash, units):
+        if self._length == len(self._equity):
+            self._grow()
+        self._stock_datetime[self._length] = stock_datetime
+        self._equity[self._length] = (close, portfolio, cash, units)
+        self._length += 1
+
+    def record_order(self, stock_datetime, side, status, size, price, value, commission):
+        self.orders.append(OrderRecord(stock_datetime, side, status, size, price, value, commission))
+
+    def equity_df(self):
+        equity_df = pd.DataFrame(self._equity[:self._length], columns=list(self.EQUITY_COLUMNS))
+        equity_df.insert(0, 'stock_datetime', self._stock_datetime[:self._length])
+        equity_df['units'] = equity_df['units'].astype(np.int64)
+        return equity_df
+
+    def orders_df(self):
+        return pd.DataFrame(
+            [[getattr(order, column) for column in OrderRecord.__slots__] for order in self.orders],
+            columns=list(OrderRecord.__slots__))
+
+    def flush(self, path_prefix, file_format='csv'):
+        '''
+        Writes the journal to <path_prefix>_equity and <path_prefix>_orders as csv or parquet files, returns the
+        paths written.
+        '''
+        if os.path.dirname(path_prefix):
+            os.makedirs(os.path.dirname(path_prefix), exist_ok=True)
+
+        paths = []
+        for name, df in (('equity', self.equity_df()), ('orders', self.orders_df())):
+            path = '{}_{}.{}'.format(path_prefix, name, file_format)
+            if file_format == 'parquet':
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+            paths.append(path)
+        return paths
@@ -0,0 +1,38 @@
+import numpy as np
+
+# Daily bars
+PERIODS_PER_YEAR = 252
+
+
+def compute_metrics(portfolio, close, position_size, traded_value, trade_pnls, periods_per_year=PERIODS_PER_YEAR):
+    '''
+    Computes the performance metrics of a backtest from its per bar portfolio value, close price, position size and
+    traded value, and the net profit of every closed trade. Ratios that are undefined (no returns, no closed trades)
+    are nan.
+    '''
+    portfolio = np.asarray(portfolio, dtype=float)
+    close = np.asarray(close, dtype=float)
+    trade_pnls = np.asarray(trade_pnls, dtype=float)
+    nan = float('nan')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = portfolio[1:] / portfolio[:-1] - 1.0
+        mean_return = returns.mean() if len(returns) else nan
+        volatility = returns.std(ddof=1) if len(returns) > 1 else nan
+        downside_deviation = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2)) if len(returns) else nan
+
+        # Same as bt.analyzers.DrawDown, the drawdown of every bar from the highest value up to that bar
+        peaks = np.maximum.accumulate(portfolio)
+        drawdowns = 100.0 * (peaks - portfolio) / peaks
+
+        annualisation = np.sqrt(periods_per_year)
+        return {
+            'symbol_return_perc': float((close[-1] - close[0]) / close[0] * 100) if len(close) else nan,
+            'sharpe_ratio': float(annualisation * mean_return / volatility) if volatility > 0 else nan,
+            'sortino_ratio': float(annualisation * mean_return / downside_deviation) if downside_deviation > 0 else nan,
+            'max_drawdown_perc': float(drawdowns.max(initial=0.0)),
+            'turnover': float(np.sum(traded_value) / portfolio.mean()) if len(portfolio) else nan,
+            'win_rate': float(np.mean(trade_pnls > 0)) if len(trade_pnls) else nan,
+            'exposure_perc': float(np.mean(np.asarray(position_size) != 0) * 100) if len(portfolio) else nan,
+            'trades': len(trade_pnls)
+        }
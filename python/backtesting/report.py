@@ -0,0 +1,32 @@
+import json
+import os
+
+
+def write_report(output_prefix, equity_df, summary):
+    '''
+    Writes the equity curve of a backtest to <output_prefix>_equity.csv and its summary to
+    <output_prefix>_summary.json, returns the paths written.
+    '''
+    if os.path.dirname(output_prefix):
+        os.makedirs(os.path.dirname(output_prefix), exist_ok=True)
+
+    equity_path = '{}_equity.csv'.format(output_prefix)
+    equity_df.to_csv(equity_path, index=False)
+
+    summary_path = '{}_summary.json'.format(output_prefix)
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    return [equity_path, summary_path]
+
+
+def save_plot(cerebro, path, figsize=(16, 14), dpi=100):
+    # matplotlib is only imported when a plot is requested, with a backend that does not need a display. pyplot is
+    # loaded before backtrader's plotting module, which would otherwise switch to an interactive backend
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+
+    figures = cerebro.plot(figsize=figsize, dpi=dpi, iplot=False)
+    figures[0][0].savefig(path, dpi=dpi)
+    return path
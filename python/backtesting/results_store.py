@@ -0,0 +1,34 @@
+import logging
+
+import sqlalchemy as sa
+
+from common.common import chunks
+from schema.data_model import BacktestResults
+
+logger = logging.getLogger(__name__)
+
+# Columns of the backtest results dataframes stored in fact_backtest_results
+RESULT_COLUMNS = [
+    'symbol', 'model_id', 'strategy', 'params', 'end_value', 'return_perc', 'symbol_return_perc', 'sharpe_ratio',
+    'sortino_ratio', 'max_drawdown_perc', 'turnover', 'win_rate', 'exposure_perc', 'trades'
+]
+
+
+def write_backtest_results(con, results_df, run_id, run_datetime, engine, initial_cash, commission, batch_size=5000):
+    '''
+    Inserts one fact_backtest_results row per row of results_df, tagged with the metadata of the run they belong to.
+    Undefined metrics (nan) are stored as NULL. Returns the number of rows written.
+    '''
+    df = results_df[RESULT_COLUMNS].astype(object)
+    records = df.where(df.notna(), None).to_dict('records')
+    for record in records:
+        record.update(run_id=run_id, run_datetime=run_datetime, engine=engine, initial_cash=initial_cash,
+                      commission=commission)
+
+    for batch in chunks(records, batch_size):
+        with con.begin():
+            con.execute(sa.insert(BacktestResults), batch)
+
+    logger.info('Wrote {} backtest results of run {} into {}'.format(
+        len(records), run_id, BacktestResults.__tablename__))
+    return len(records)
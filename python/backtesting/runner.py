@@ -0,0 +1,48 @@
+import logging
+
+import backtrader as bt
+
+from backtesting.analyzers import EquityCurve
+from backtesting.metrics import compute_metrics
+from backtesting.strategy import STRATEGIES
+
+
+def run_backtest(data, strategy_name, params, initial_cash, commission, stdstats=True, log_level=logging.DEBUG,
+                 journal=None):
+    '''
+    Runs a single backtest of strategy_name with params over the data feed, returns the cerebro instance and a dict
+    of the results with the performance metrics of backtesting.metrics. The strategy only prints messages of
+    log_level and above, and records the run into journal when a BacktestJournal is given.
+    '''
+    # initialise cerebro, observers are only needed when the result is plotted
+    cerebro = bt.Cerebro(stdstats=stdstats)
+
+    # add strategy
+    cerebro.addstrategy(STRATEGIES[strategy_name], params, log_level=log_level, journal=journal)
+    cerebro.addanalyzer(EquityCurve, _name='equity')
+
+    # add data to cerebro
+    cerebro.adddata(data)
+
+    # set configurations
+    cerebro.broker.setcash(initial_cash)
+    cerebro.broker.setcommission(commission)
+    cerebro.broker.set_coc(True)
+
+    start_portfolio = cerebro.broker.getvalue()
+    strategy = cerebro.run()[0]
+    end_portfolio = cerebro.broker.getvalue()
+
+    equity_df = strategy.analyzers.equity.get_analysis()
+    return cerebro, {
+        'start_value': start_portfolio,
+        'end_value': end_portfolio,
+        'return_perc': (end_portfolio - start_portfolio) / start_portfolio * 100,
+        **compute_metrics(equity_df['portfolio'], equity_df['close'], equity_df['position_size'],
+                          equity_df['traded_value'], strategy.analyzers.equity.trade_pnls)
+    }
+
+
+def get_equity_curve(cerebro):
+    # Equity of every bar of a cerebro instance run by run_backtest
+    return cerebro.runstrats[0][0].analyzers.equity.get_analysis()
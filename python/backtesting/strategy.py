@@ -1,10 +1,21 @@
+import logging
+
 import backtrader as bt
 from .indicator import MyIndicator
 
 
 class commonStrategy():
-    def log(self, txt, dt=None):
-        ''' Logging function for this strategy'''
+    def init_log(self, log_level=logging.DEBUG, journal=None):
+        ''' Sets the lowest level printed by log, and the optional BacktestJournal recording the run'''
+        self.log_level = logging.getLevelName(log_level) if isinstance(log_level, str) else log_level
+        self.journal = journal
+
+    def log(self, txt, *args, dt=None, level=logging.INFO):
+        ''' Logging function for this strategy, txt is only formatted with args when level is printed'''
+        if level < self.log_level:
+            return
+        if args:
+            txt = txt % args
         dt = dt or self.datas[0].datetime.date(0)
         portfolio = self.broker.get_value()
         cash = self.broker.cash
@@ -13,6 +24,17 @@ class commonStrategy():
         print('%s, PF %.0f, Cash %.0f, Equity %i, CF %s Units %i' % (
             dt.isoformat(), portfolio, cash, equity, '{:.0%}'.format(cashflow), self.units), txt)
 
+    def journal_bar(self):
+        if self.journal is not None:
+            self.journal.record_bar(self.datas[0].datetime.datetime(0), self.dataclose[0], self.portfolio, self.cash,
+                                    self.units)
+
+    def journal_order(self, order):
+        if self.journal is not None:
+            self.journal.record_order(self.datas[0].datetime.datetime(0), 'BUY' if order.isbuy() else 'SELL',
+                                      order.getstatusname(), order.executed.size or order.created.size,
+                                      order.executed.price, order.executed.value, order.executed.comm)
+
     def perc_cash_to_units(self, cash, close, perc):
         return int(cash * perc / close)
 
@@ -25,8 +47,7 @@ class commonStrategy():
         if cash >= value:
             self.order = self.buy(size=n_units)
             self.units += n_units
-            self.log('BUY CREATE, Price %.2f, Units %i, Value %.2f' %
-                     (close, n_units, value))
+            self.log('BUY CREATE, Price %.2f, Units %i, Value %.2f', close, n_units, value)
 
     def sell_by_perc(self, close, sell_perc):
         if self.units:
@@ -35,11 +56,10 @@ class commonStrategy():
             if self.units >= n_units:
                 self.order = self.sell(size=n_units)
                 self.units -= n_units
-                self.log('SELL CREATE, Close %.2f, Units %i, Value %.2f' %
-                         (close, n_units, value))
+                self.log('SELL CREATE, Close %.2f, Units %i, Value %.2f', close, n_units, value)
 
 class FollowTheTrendBollinger(bt.Strategy, commonStrategy):
-    def __init__(self, params_dict):
+    def __init__(self, params_dict, log_level=logging.DEBUG, journal=None):
         # Set params
         self.params.maperiod = params_dict['maperiod']
         self.params.buy_perc = params_dict['buy_perc']
@@ -55,6 +75,7 @@ class FollowTheTrendBollinger(bt.Strategy, commonStrategy):
         # Keep track of order and equity
         self.order = None
         self.units = 0
+        self.init_log(log_level, journal)
 
         # Add a MovingAverageSimple indicator
         self.bband = bt.indicators.BollingerBands(period=self.params.maperiod, devfactor=self.params.stdev)
@@ -64,15 +85,16 @@ class FollowTheTrendBollinger(bt.Strategy, commonStrategy):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
             return
+        self.journal_order(order)
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %(order.executed.price, order.executed.value, order.executed.comm))
+                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
             else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' % (order.executed.price, order.executed.value, order.executed.comm))
+                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
             self.bar_executed = len(self)
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
@@ -84,7 +106,8 @@ class FollowTheTrendBollinger(bt.Strategy, commonStrategy):
         # Simply log the closing price of the series from the reference
         self.portfolio = self.broker.get_value()
         self.cash = self.broker.cash
-        self.log('Close %.2f,' % (self.dataclose[0]))
+        self.journal_bar()
+        self.log('Close %.2f,', self.dataclose[0], level=logging.DEBUG)
 
         # Buy section
         if self.dataclose[0] >= self.bband.lines.top[0]:
@@ -97,7 +120,7 @@ class FollowTheTrendBollinger(bt.Strategy, commonStrategy):
 
 ########################################################################################################################
 class FollowTheTrendMA(bt.Strategy, commonStrategy):
-    def __init__(self, params_dict):
+    def __init__(self, params_dict, log_level=logging.DEBUG, journal=None):
         # Set params
         self.params.maperiod = params_dict['maperiod']
         self.params.maperiod2 = params_dict['maperiod2']
@@ -114,6 +137,7 @@ class FollowTheTrendMA(bt.Strategy, commonStrategy):
         # Keep track of order and equity
         self.order = None
         self.units = 0
+        self.init_log(log_level, journal)
 
         # Add a MovingAverageSimple indicator
         # self.bband = bt.indicators.BollingerBands(period=self.params.maperiod, devfactor=self.params.stdev)
@@ -127,15 +151,16 @@ class FollowTheTrendMA(bt.Strategy, commonStrategy):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
             return
+        self.journal_order(order)
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %(order.executed.price, order.executed.value, order.executed.comm))
+                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
             else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' % (order.executed.price, order.executed.value, order.executed.comm))
+                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
             self.bar_executed = len(self)
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
@@ -146,7 +171,8 @@ class FollowTheTrendMA(bt.Strategy, commonStrategy):
         # Simply log the closing price of the series from the reference
         self.portfolio = self.broker.get_value()
         self.cash = self.broker.cash
-        self.log('Close %.2f,' % (self.dataclose[0]))
+        self.journal_bar()
+        self.log('Close %.2f,', self.dataclose[0], level=logging.DEBUG)
 
         # Buy section
         if self.sma_crossover > 0:
@@ -167,7 +193,7 @@ class FollowTheTrendMA(bt.Strategy, commonStrategy):
 
 ########################################################################################################################
 class MeanReversionMinMax(bt.Strategy, commonStrategy):
-    def __init__(self, params_dict):
+    def __init__(self, params_dict, log_level=logging.DEBUG, journal=None):
         # Set params
         self.params.maperiod = params_dict['maperiod']
         self.params.buy_perc = params_dict['buy_perc']
@@ -183,6 +209,7 @@ class MeanReversionMinMax(bt.Strategy, commonStrategy):
         # Keep track of order and equity
         self.order = None
         self.units = 0
+        self.init_log(log_level, journal)
 
         # Add a MovingAverageSimple indicator
         self.max = bt.ind.MaxN(self.dataclose, period=self.params.maperiod, subplot=False)
@@ -196,15 +223,16 @@ class MeanReversionMinMax(bt.Strategy, commonStrategy):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
             return
+        self.journal_order(order)
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %(order.executed.price, order.executed.value, order.executed.comm))
+                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
             else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' % (order.executed.price, order.executed.value, order.executed.comm))
+                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
             self.bar_executed = len(self)
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
@@ -215,7 +243,8 @@ class MeanReversionMinMax(bt.Strategy, commonStrategy):
         # Simply log the closing price of the series from the reference
         self.portfolio = self.broker.get_value()
         self.cash = self.broker.cash
-        self.log('Close %.2f,' % (self.dataclose[0]))
+        self.journal_bar()
+        self.log('Close %.2f,', self.dataclose[0], level=logging.DEBUG)
 
         # Buy section
         # if self.datas[0].close <= self.bband.lines.bot[0]:
@@ -229,7 +258,7 @@ class MeanReversionMinMax(bt.Strategy, commonStrategy):
 
 ########################################################################################################################
 class MeanReversionBollinger(bt.Strategy, commonStrategy):
-    def __init__(self, params_dict):
+    def __init__(self, params_dict, log_level=logging.DEBUG, journal=None):
         # Set params
         self.params.maperiod = params_dict['maperiod']
         self.params.buy_perc = params_dict['buy_perc']
@@ -245,6 +274,7 @@ class MeanReversionBollinger(bt.Strategy, commonStrategy):
         # Keep track of order and equity
         self.order = None
         self.units = 0
+        self.init_log(log_level, journal)
 
         # Add a MovingAverageSimple indicator
         self.bband = bt.indicators.BollingerBands(period=self.params.maperiod, devfactor=self.params.stdev)
@@ -256,15 +286,16 @@ class MeanReversionBollinger(bt.Strategy, commonStrategy):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
             return
+        self.journal_order(order)
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %(order.executed.price, order.executed.value, order.executed.comm))
+                self.log('BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
             else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' % (order.executed.price, order.executed.value, order.executed.comm))
+                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f', order.executed.price, order.executed.value, order.executed.comm)
             self.bar_executed = len(self)
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
@@ -275,7 +306,8 @@ class MeanReversionBollinger(bt.Strategy, commonStrategy):
         # Simply log the closing price of the series from the reference
         self.portfolio = self.broker.get_value()
         self.cash = self.broker.cash
-        self.log('Close %.2f,' % (self.dataclose[0]))
+        self.journal_bar()
+        self.log('Close %.2f,', self.dataclose[0], level=logging.DEBUG)
 
         # Buy section
         # if self.datas[0].close <= self.bband.lines.bot[0]:
@@ -286,3 +318,12 @@ class MeanReversionBollinger(bt.Strategy, commonStrategy):
         # if self.datas[0].close >= self.bband.lines.top[0]:
         if self.crossovertop > 0:
             self.sell_by_perc(self.dataclose[0], self.params.sell_perc)
+
+
+# Strategies selectable by name from the BACK_TESTING configuration
+STRATEGIES = {
+    'FollowTheTrendMA': FollowTheTrendMA,
+    'FollowTheTrendBollinger': FollowTheTrendBollinger,
+    'MeanReversionMinMax': MeanReversionMinMax,
+    'MeanReversionBollinger': MeanReversionBollinger
+}
@@ -0,0 +1,85 @@
+import itertools
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtesting.custom_datafeed import PandasData
+from backtesting.runner import run_backtest
+from backtesting.vector_engine import run_vector_backtest
+
+# Actualised data of each (symbol, model_id), set once per worker process by _init_worker
+_sweep_data = {}
+
+
+def expand_param_values(value):
+    '''
+    Expands a sweep parameter into its list of values. A value can be a single value, a list of values, or a range
+    given as {"START": .., "STOP": .., "STEP": ..} where STOP is inclusive.
+    '''
+    if isinstance(value, dict):
+        values = np.arange(value['START'], value['STOP'] + value['STEP'] / 2, value['STEP'])
+        # Keep integer ranges as ints and round away floating point noise of float ranges
+        if all(isinstance(value[key], int) for key in ('START', 'STOP', 'STEP')):
+            return [int(v) for v in values]
+        return [round(float(v), 10) for v in values]
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def expand_param_grid(base_params, sweep_params):
+    # Cartesian product of every swept parameter, parameters that are not swept keep their base value
+    params = dict(base_params)
+    params.update(sweep_params or {})
+    names = list(params)
+    for values in itertools.product(*[expand_param_values(params[name]) for name in names]):
+        yield dict(zip(names, values))
+
+
+def build_sweep_tasks(symbols, models, strategies, base_params, sweep_params):
+    tasks = []
+    for symbol, model_id, strategy_name in itertools.product(symbols, models, strategies):
+        for params in expand_param_grid(base_params[strategy_name], sweep_params.get(strategy_name)):
+            tasks.append((symbol, model_id, strategy_name, params))
+    return tasks
+
+
+def _init_worker(sweep_data):
+    global _sweep_data
+    _sweep_data = sweep_data
+
+
+def _run_sweep_task(task, initial_cash, commission, engine, log_level):
+    symbol, model_id, strategy_name, params = task
+    data = _sweep_data[(symbol, model_id)]
+    if engine == 'vector':
+        result, _ = run_vector_backtest(data, strategy_name, params, initial_cash, commission)
+    else:
+        _, result = run_backtest(PandasData(dataname=data), strategy_name, params, initial_cash, commission,
+                                 stdstats=False, log_level=log_level)
+    return dict(symbol=symbol, model_id=model_id, strategy=strategy_name, params=json.dumps(params), **result)
+
+
+def run_sweep(sweep_data, tasks, initial_cash, commission, max_workers, engine='backtrader', log_level=logging.WARNING,
+              rank_by='end_value'):
+    '''
+    Runs every (symbol, model_id, strategy, params) task on a pool of max_workers processes without plotting, and
+    returns the results ranked by the rank_by metric, highest first, then by the lowest max drawdown. engine is
+    either "backtrader" or "vector" for the NumPy implementation of the strategies in backtesting.vector_engine.
+    Backtrader strategies only print messages of log_level and above.
+    '''
+    logger = logging.getLogger(__name__)
+    logger.info('Running {} backtests on {} workers with the {} engine'.format(len(tasks), max_workers, engine))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(sweep_data,)) as executor:
+        results = list(executor.map(
+            _run_sweep_task, tasks, itertools.repeat(initial_cash), itertools.repeat(commission), itertools.repeat(engine),
+            itertools.repeat(log_level),
+            chunksize=max(1, len(tasks) // (max_workers * 4))))
+
+    results_df = pd.DataFrame(results).sort_values([rank_by, 'max_drawdown_perc'], ascending=[False, True])
+    results_df.insert(0, 'rank', np.arange(1, len(results_df) + 1))
+    return results_df.reset_index(drop=True)
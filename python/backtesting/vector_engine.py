@@ -0,0 +1,281 @@
+'''
+NumPy implementation of the strategies in backtesting.strategy. The indicators and signals are computed as whole
+arrays and the broker is only stepped on the bars where a strategy creates orders, reproducing what backtrader does
+for the same strategy when run by backtesting.runner:
+
+- indicators use the same operations as backtrader (math.fsum moving sums, NonZeroDifference crossovers), so the
+  signals are bit for bit the same
+- the strategy next() starts on the bar where all its indicators are available
+- buy_by_perc/sell_by_perc sizing uses the broker cash seen at the start of next() and the strategy units counter,
+  which is updated when an order is created even if the broker later rejects it
+- orders are checked against the cash by the broker on the next bar and executed at the close of the bar they were
+  created on (cheat-on-close), with a percentage commission. Orders created on the last bar are never executed
+'''
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtesting.metrics import compute_metrics
+
+BUY = 1
+SELL = -1
+
+
+def _sma(values, period):
+    # Same as bt.ind.SMA, a math.fsum of the window divided by the period
+    sma = np.full(len(values), np.nan)
+    if len(values) >= period:
+        sma[period - 1:] = [math.fsum(window) / period for window in sliding_window_view(values, period).tolist()]
+    return sma
+
+
+def _bollinger_bands(close, period, devfactor):
+    # Same as bt.indicators.BollingerBands, returns the (top, bot) bands
+    mid = _sma(close, period)
+    stddev = devfactor * np.power(np.abs(_sma(np.power(close, 2), period) - np.power(mid, 2)), 0.5)
+    return mid + stddev, mid - stddev
+
+
+def _rolling_max(values, period):
+    rolling = np.full(len(values), np.nan)
+    if len(values) >= period:
+        rolling[period - 1:] = sliding_window_view(values, period).max(axis=1)
+    return rolling
+
+
+def _rolling_min(values, period):
+    rolling = np.full(len(values), np.nan)
+    if len(values) >= period:
+        rolling[period - 1:] = sliding_window_view(values, period).min(axis=1)
+    return rolling
+
+
+def _crossover(data0, data1, first):
+    '''
+    Same as bt.ind.CrossOver of two lines that are both available from index first: 1.0 when data0 crosses data1
+    upwards, -1.0 when it crosses downwards, valid from index first + 1.
+    '''
+    cross = np.zeros(len(data0))
+    if len(data0) <= first + 1:
+        return cross
+
+    # NonZeroDifference, the last difference that was not zero seeded with the difference on index first
+    diff = data0 - data1
+    index = np.arange(len(diff))
+    index = np.maximum.accumulate(np.where((diff != 0) | (index == first), index, first)[first:])
+    nzd = diff[index]
+
+    previous = nzd[:-1]
+    up = (previous < 0.0) & (data0[first + 1:] > data1[first + 1:])
+    down = (previous > 0.0) & (data0[first + 1:] < data1[first + 1:])
+    cross[first + 1:] = up.astype(float) - down.astype(float)
+    return cross
+
+
+def _follow_the_trend_bollinger(close, params):
+    period = params['maperiod']
+    top, bot = _bollinger_bands(close, period, params['stdev'])
+    with np.errstate(invalid='ignore'):
+        actions = np.column_stack([close >= top, close <= bot])
+    return period - 1, actions, (BUY, SELL)
+
+
+def _follow_the_trend_ma(close, params):
+    period, period2 = params['maperiod'], params['maperiod2']
+    sma1 = _sma(close, period)
+    sma2 = _sma(close, period2)
+    sma_crossover = _crossover(sma1, sma2, max(period, period2) - 1)
+    close_ma_crossover = _crossover(close, sma1, period - 1)
+    with np.errstate(invalid='ignore'):
+        actions = np.column_stack([
+            sma_crossover > 0,
+            (sma1 > sma2) & (close_ma_crossover > 0),
+            sma_crossover < 0,
+            (sma1 < sma2) & (close_ma_crossover < 0)
+        ])
+    return max(period, period2), actions, (BUY, BUY, SELL, SELL)
+
+
+def _mean_reversion_min_max(close, params):
+    period = params['maperiod']
+    actions = np.column_stack([close == _rolling_min(close, period), close == _rolling_max(close, period)])
+    return period, actions, (BUY, SELL)
+
+
+def _mean_reversion_bollinger(close, params):
+    period = params['maperiod']
+    top, bot = _bollinger_bands(close, period, params['stdev'])
+    actions = np.column_stack([
+        _crossover(close, bot, period - 1) < 0,
+        _crossover(close, top, period - 1) > 0
+    ])
+    return period, actions, (BUY, SELL)
+
+
+# Signal functions of the strategies in backtesting.strategy.STRATEGIES, each returns the index of the first bar the
+# strategy runs on, a (bars, actions) boolean array of the orders it tries to create on every bar, and the side of
+# every action in the order next() evaluates them
+VECTOR_STRATEGIES = {
+    'FollowTheTrendMA': _follow_the_trend_ma,
+    'FollowTheTrendBollinger': _follow_the_trend_bollinger,
+    'MeanReversionMinMax': _mean_reversion_min_max,
+    'MeanReversionBollinger': _mean_reversion_bollinger
+}
+
+
+def _split_order(position_size, size):
+    # Parts of an order of size that close the position and that open (or increase) it, as bt.Position.update
+    new_size = position_size + size
+    if not new_size:
+        return 0, size
+    if not position_size or (position_size > 0) == (size > 0):
+        return size, 0
+    if (new_size > 0) == (position_size > 0):
+        return 0, size
+    return new_size, -position_size
+
+
+def _check_orders(orders, price, cash, position_size, commission):
+    # Pseudo executes the orders in sequence like BackBroker.check_submitted, returns the ones that are accepted
+    accepted = []
+    for size in orders:
+        opened, closed = _split_order(position_size, size)
+        position_size += size
+        if closed:
+            cash += -closed * price
+            cash -= abs(closed) * commission * price
+        if opened:
+            cash -= opened * price
+            cash -= abs(opened) * commission * price
+        if cash >= 0.0:
+            accepted.append(size)
+    return accepted
+
+
+class _Broker:
+    '''Cash, position and trades of a run, updated like BackBroker on the bars orders are executed'''
+
+    def __init__(self, cash, commission):
+        self.cash = cash
+        self.commission = commission
+        self.position_size = 0
+        self.position_price = 0.0
+        self.trade_pnl = 0.0
+        self.trade_pnls = []
+        self.execution_bars = []
+        self.history = [(self.cash, self.position_size, self.position_price, 0.0)]
+
+    def execute(self, bar, orders, price):
+        # Executes the accepted orders at price like BackBroker._execute and records the state of the bar
+        commission, traded_value = self.commission, 0.0
+        for size in _check_orders(orders, price, self.cash, self.position_size, commission):
+            opened, closed = _split_order(self.position_size, size)
+            if closed:
+                pnl = -closed * (price - self.position_price)
+                closed_commission = abs(closed) * commission * price
+                self.cash = self.cash + (-closed * self.position_price + pnl)
+                self.cash -= closed_commission
+                self.trade_pnl += pnl - closed_commission
+            if opened:
+                opened_commission = abs(opened) * commission * price
+                opened_cash = self.cash - opened * price - opened_commission
+                if opened_cash < 0.0:
+                    opened = 0
+                else:
+                    self.cash = opened_cash
+
+            executed = closed + opened
+            if not executed:
+                continue
+            traded_value += abs(executed) * price
+            self._update_position(executed, price)
+            if closed and (not self.position_size or opened):
+                # The trade is closed when the position is, a reversal opens the next one
+                self.trade_pnls.append(self.trade_pnl)
+                self.trade_pnl = 0.0
+            if opened:
+                self.trade_pnl -= opened_commission
+
+        self.execution_bars.append(bar)
+        self.history.append((self.cash, self.position_size, self.position_price, traded_value))
+
+    def _update_position(self, size, price):
+        new_size = self.position_size + size
+        if not new_size:
+            self.position_price = 0.0
+        elif not self.position_size or (new_size > 0) != (self.position_size > 0):
+            self.position_price = price
+        elif (size > 0) == (self.position_size > 0):
+            self.position_price = (self.position_price * self.position_size + size * price) / new_size
+        self.position_size = new_size
+
+    def equity(self, close):
+        '''
+        Position size, traded value and broker value of every bar, the state after the executions on a bar applies
+        from that bar on
+        '''
+        execution_bars = np.array(self.execution_bars, dtype=np.int64)
+        cash, size, price, traded = (np.array(column) for column in zip(*self.history))
+        state = np.searchsorted(execution_bars, np.arange(len(close)), side='right')
+
+        traded_value = np.zeros(len(close))
+        traded_value[execution_bars] = traded[1:]
+
+        value = size[state] * close
+        unrealised = size[state] * (close - price[state])
+        # BackBroker._get_value takes the unrealised profit out of a long position's value and adds it back, which is
+        # not exact in floating point. Repeated here so the portfolio values round the same way as backtrader's
+        value = np.where(size[state] > 0, (value - unrealised) + unrealised, value)
+        return size[state], traded_value, cash[state] + value
+
+
+def run_vector_backtest(data, strategy_name, params, initial_cash, commission):
+    '''
+    Runs strategy_name with params over the data dataframe of the actualised table and returns the same results
+    dict as backtesting.runner.run_backtest, together with the portfolio value of every bar.
+    '''
+    close = data['close'].to_numpy(dtype=float)
+    first, actions, sides = VECTOR_STRATEGIES[strategy_name](close, params)
+    buy_perc, sell_perc = params['buy_perc'], params['sell_perc']
+
+    broker = _Broker(float(initial_cash), commission)
+    units = 0
+
+    orders, order_bar = [], None
+    signal_bars = np.flatnonzero(actions[first:].any(axis=1)) + first if first < len(close) else []
+    for bar in signal_bars:
+        # The orders created on order_bar are executed on the following bar at the close of order_bar
+        if orders:
+            broker.execute(order_bar + 1, orders, close[order_bar])
+
+        orders, order_bar = [], bar
+        cash, bar_close = broker.cash, close[bar]
+        for side in np.compress(actions[bar], sides):
+            if side == BUY:
+                n_units = int(cash * buy_perc / bar_close)
+                if cash >= n_units * bar_close:
+                    if n_units:
+                        orders.append(n_units)
+                    units += n_units
+            elif units:
+                n_units = int(units * sell_perc)
+                if units >= n_units:
+                    if n_units:
+                        orders.append(-n_units)
+                    units -= n_units
+
+    if orders and order_bar + 1 < len(close):
+        broker.execute(order_bar + 1, orders, close[order_bar])
+
+    position_size, traded_value, values = broker.equity(close)
+
+    start_value = float(initial_cash)
+    end_value = float(values[-1]) if len(values) else start_value
+    return {
+        'start_value': start_value,
+        'end_value': end_value,
+        'return_perc': (end_value - start_value) / start_value * 100,
+        **compute_metrics(values, close, position_size, traded_value, broker.trade_pnls)
+    }, values
@@ -0,0 +1,64 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtesting.custom_datafeed import PandasData
+from backtesting.runner import run_backtest
+from backtesting.vector_engine import run_vector_backtest
+from config_reader import ConfigReader
+
+
+def make_actualised_data(n_bars, seed):
+    # Random walk of close prices in the columns of the actualised table read by the backtests
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars))), 2)
+    return pd.DataFrame({
+        'stock_datetime': pd.bdate_range('2019-01-01', periods=n_bars), 'symbol': 'SYM{}'.format(seed),
+        'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close, 'adj_close': close,
+        'volume': rng.integers(100000, 1000000, n_bars).astype(float), 'future_close': np.roll(close, -1)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time of the vector engine against backtrader for the configured strategies, and whether their '
+                    'end values agree to the cent')
+    parser.add_argument('--series', type=int, default=20)
+    parser.add_argument('--bars', type=int, default=750)
+    parser.add_argument('--commission', type=float, default=0.001)
+    args = parser.parse_args()
+
+    backtesting_config = ConfigReader('../configurations/run_config.json').BACK_TESTING
+    initial_cash = backtesting_config['INITIAL_CASH']
+    strategy_params = backtesting_config['PARAMS']
+    datasets = [make_actualised_data(args.bars, seed) for seed in range(args.series)]
+
+    backtrader_time, vector_time, mismatches = 0.0, 0.0, 0
+    for data in datasets:
+        for strategy_name, params in strategy_params.items():
+            start_time = time.perf_counter()
+            _, expected = run_backtest(PandasData(dataname=data), strategy_name, params, initial_cash,
+                                       args.commission, stdstats=False, log_level=logging.WARNING)
+            backtrader_time += time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            result, _ = run_vector_backtest(data, strategy_name, params, initial_cash, args.commission)
+            vector_time += time.perf_counter() - start_time
+
+            if abs(result['end_value'] - expected['end_value']) >= 0.005:
+                mismatches += 1
+                print('{} on {}: backtrader {:.2f}, vector {:.2f}'.format(
+                    strategy_name, data['symbol'].iat[0], expected['end_value'], result['end_value']))
+
+    n_runs = len(datasets) * len(strategy_params)
+    print('{} runs of {} bars, {} end values differ by a cent or more'.format(n_runs, args.bars, mismatches))
+    print('backtrader {:>8.2f}s {:>8.2f}ms per run'.format(backtrader_time, backtrader_time / n_runs * 1000))
+    print('vector     {:>8.2f}s {:>8.2f}ms per run'.format(vector_time, vector_time / n_runs * 1000))
+    print('speedup    {:>8.1f}x'.format(backtrader_time / vector_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,4 +11,24 @@ def write_pickle(file_path, data):
 
 def read_pickle(file_path):
     with open(file_path, 'rb') as f:
-        return pickle.load(f)
\ No newline at end of file
+        return pickle.load(f)
+
+def prune_file_groups(dir, file_prefix, keep_last):
+    '''
+    Files named {file_prefix}_{digest}_*.npy hold one cache entry per digest. Removes all but the keep_last most
+    recently modified entries, so the caches under dir do not grow with every run.
+    '''
+    groups = {}
+    for file in os.listdir(dir):
+        if file.startswith(file_prefix + '_'):
+            groups.setdefault(file.split('_')[1], []).append(os.path.join(dir, file))
+
+    last_used = sorted(groups, key=lambda digest: max(os.path.getmtime(path) for path in groups[digest]), reverse=True)
+    for digest in last_used[keep_last:]:
+        for path in groups[digest]:
+            os.remove(path)
+    return len(last_used[keep_last:])
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,42 @@
+from datetime import datetime as dt
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import insert
+
+from schema.data_model import EtlWatermarks, SymbolWatermarks
+
+
+def read_high_water_mark(con, table_name):
+    row = con.execute(
+        sa.select(EtlWatermarks.high_water_mark).where(EtlWatermarks.table_name == table_name)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def write_high_water_mark(con, table_name, high_water_mark):
+    ins = insert(EtlWatermarks).values(table_name=table_name, high_water_mark=high_water_mark, date_updated=dt.utcnow())
+    con.execute(ins.on_duplicate_key_update(high_water_mark=ins.inserted.high_water_mark,
+                                            date_updated=ins.inserted.date_updated))
+
+
+def read_symbol_watermarks(con, symbols):
+    # Latest stock_datetime loaded for each symbol, symbols that were never loaded are missing
+    rows = con.execute(
+        sa.select(SymbolWatermarks.symbol, SymbolWatermarks.high_water_mark)
+        .where(SymbolWatermarks.symbol.in_(symbols))
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def write_symbol_watermarks(con, high_water_marks):
+    # Single multi-row upsert of {symbol: high_water_mark}, a watermark never moves back when older data is loaded
+    if not high_water_marks:
+        return
+    date_updated = dt.utcnow()
+    ins = insert(SymbolWatermarks).values([
+        dict(symbol=symbol, high_water_mark=high_water_mark, date_updated=date_updated)
+        for symbol, high_water_mark in high_water_marks.items()
+    ])
+    con.execute(ins.on_duplicate_key_update(
+        high_water_mark=sa.func.greatest(SymbolWatermarks.high_water_mark, ins.inserted.high_water_mark),
+        date_updated=ins.inserted.date_updated))
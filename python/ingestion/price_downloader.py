@@ -0,0 +1,148 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from python.common.common import chunks, read_pickle
+
+logger = logging.getLogger(__name__)
+
+
+class YahooPriceProvider:
+    '''
+    Daily prices of a list of tickers from Yahoo Finance, in the wide yf.download format with (field, ticker)
+    columns.
+    '''
+
+    def download(self, tickers, start, end=None):
+        import yfinance as yf
+
+        # yfinance's own threads are disabled, concurrency is handled by the downloader
+        data = yf.download(tickers, start=start, end=end, group_by='column', threads=False, progress=False)
+        if len(tickers) == 1 and not isinstance(data.columns, pd.MultiIndex):
+            # A single ticker comes back without the ticker level
+            data = pd.concat({tickers[0]: data}, axis=1).swaplevel(axis=1)
+        return data
+
+
+class LocalPriceProvider:
+    '''
+    Prices read from a pickled dataframe in the yf.download format, so the ingestion job can run against a local
+    fixture instead of Yahoo Finance.
+    '''
+
+    def __init__(self, fixture_path):
+        self.data = read_pickle(fixture_path)
+
+    def download(self, tickers, start, end=None):
+        tickers = [ticker for ticker in tickers if ticker in self.data.columns.get_level_values(1)]
+        rows = self.data.index >= pd.Timestamp(start)
+        if end is not None:
+            rows &= self.data.index < pd.Timestamp(end)
+        return self.data.loc[rows, pd.IndexSlice[:, tickers]]
+
+
+def make_price_provider(download_config):
+    if download_config['PROVIDER'] == 'yahoo':
+        return YahooPriceProvider()
+    if download_config['PROVIDER'] == 'local':
+        return LocalPriceProvider(download_config['FIXTURE_PATH'])
+    raise ValueError('Unknown price provider {}'.format(download_config['PROVIDER']))
+
+
+def group_tickers_by_start_date(tickers, symbol_watermarks, default_start_date):
+    '''
+    Groups the tickers on the date their download starts from: the date of their watermark, or default_start_date
+    for tickers that were never loaded. Tickers that are up to date share one group, so a lagging or new ticker does
+    not widen the download of the others.
+    '''
+    groups = {}
+    for ticker in tickers:
+        if ticker in symbol_watermarks:
+            start_date = pd.Timestamp(symbol_watermarks[ticker]).normalize()
+        else:
+            start_date = pd.Timestamp(default_start_date)
+        groups.setdefault(start_date, []).append(ticker)
+    return dict(sorted(groups.items()))
+
+
+def missing_tickers(data, tickers):
+    # Tickers of the list without a single price in data, either missing from its columns or with all NaN columns
+    has_prices = data.notna().any().groupby(level=1).any()
+    return [ticker for ticker in tickers if not has_prices.get(ticker, False)]
+
+
+def join_downloads(frames):
+    # Joins the data downloaded for different tickers of a chunk on their dates
+    if not frames:
+        return None
+    return frames[0] if len(frames) == 1 else pd.concat(frames, axis=1).sort_index(axis=1)
+
+
+class ChunkedDownloader:
+    '''
+    Splits the tickers into chunks of chunk_size and downloads them from provider on a pool of max_workers threads,
+    at most 2 * max_workers chunks in flight so finished chunks do not pile up in memory. A failing chunk, or the
+    tickers of a chunk that came back without any price, are retried max_retries times, waiting
+    backoff_seconds * 2 ** attempt between attempts, then given up on and added to failed_tickers.
+    '''
+
+    def __init__(self, provider, chunk_size=100, max_workers=4, max_retries=3, backoff_seconds=1.0):
+        self.provider = provider
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.failed_tickers = []
+
+    def _download(self, tickers, start, end):
+        # Returns the data downloaded for tickers, None when there is none, and the tickers given up on. yf.download
+        # does not raise for a failing ticker, it returns its columns as NaN, so only those tickers are retried
+        downloaded = []
+        for attempt in range(self.max_retries + 1):
+            try:
+                data = self.provider.download(tickers, start=start, end=end)
+            except Exception as e:
+                error = e
+            else:
+                missing = missing_tickers(data, tickers)
+                if len(missing) < len(tickers):
+                    downloaded.append(data.loc[:, ~data.columns.get_level_values(1).isin(missing)])
+                if not missing:
+                    return join_downloads(downloaded), []
+                tickers, error = missing, 'no prices returned'
+
+            if attempt < self.max_retries:
+                wait_seconds = self.backoff_seconds * 2 ** attempt
+                logger.warning('Download of {} tickers from {} failed ({}), retrying in {:.1f}s'.format(
+                    len(tickers), tickers[0], error, wait_seconds))
+                time.sleep(wait_seconds)
+
+        logger.error('Giving up on {} tickers from {}: {}'.format(len(tickers), tickers[0], error))
+        return join_downloads(downloaded), tickers
+
+    def iter_chunks(self, tickers, start, end=None):
+        # Yields the downloaded dataframe of every chunk in completion order, for the caller to transform and load
+        # while the next chunks are downloading
+        ticker_chunks = iter(chunks(list(tickers), self.chunk_size))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+
+            def submit_next():
+                chunk = next(ticker_chunks, None)
+                if chunk is not None:
+                    pending.add(executor.submit(self._download, chunk, start, end))
+
+            for _ in range(2 * self.max_workers):
+                submit_next()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    submit_next()
+                    data, failed_tickers = future.result()
+                    self.failed_tickers.extend(failed_tickers)
+                    if data is not None:
+                        yield data
@@ -0,0 +1,77 @@
+import logging
+import time
+
+import pandas as pd
+from sqlalchemy.dialects.mysql import insert
+
+from schema.data_model import StockPrices
+from python.common.common import chunks
+from python.common.etl_watermarks import write_symbol_watermarks
+
+logger = logging.getLogger(__name__)
+
+# Mapping of transformed yf columns to fact_stock_prices columns
+STOCK_PRICE_COLUMNS = {
+    'Symbol': 'symbol', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Adj Close': 'adj_close',
+    'Volume': 'volume'
+}
+
+
+def to_stock_price_records(transformed_df):
+    # Convert the transformed df into a list of dicts keyed on the table columns, ready for executemany
+    df = transformed_df[list(STOCK_PRICE_COLUMNS)].rename(columns=STOCK_PRICE_COLUMNS)
+    df['stock_datetime'] = transformed_df.index.to_pydatetime()
+    return df.to_dict('records')
+
+
+def drop_loaded_rows(transformed_df, symbol_watermarks):
+    # Keep the rows from each symbol's watermark on, the watermark row itself is upserted again in case it was loaded
+    # before the trading day closed, earlier rows come from time zone differences in the download
+    watermarks = pd.to_datetime(transformed_df['Symbol'].map(symbol_watermarks))
+    return transformed_df[watermarks.isna().to_numpy() | (transformed_df.index >= watermarks).to_numpy()]
+
+
+def batch_watermarks(batch):
+    # Latest stock_datetime of each symbol in a batch of records
+    high_water_marks = {}
+    for record in batch:
+        symbol = record['symbol']
+        if symbol not in high_water_marks or record['stock_datetime'] > high_water_marks[symbol]:
+            high_water_marks[symbol] = record['stock_datetime']
+    return high_water_marks
+
+
+def load_stock_prices(con, transformed_df, batch_size, update_watermarks=False):
+    '''
+    Upserts the transformed rows batch_size at a time on the (symbol, stock_datetime) key, rows that were loaded
+    before are overwritten, and left untouched by MySQL when their prices did not change. With update_watermarks,
+    each symbol's watermark in etl_symbol_watermarks is moved up in the same transaction as the batch, so a failed
+    load resumes after the last committed batch.
+    '''
+    records = to_stock_price_records(transformed_df)
+    total_rows = len(records)
+    row_count = 0
+    start_time = time.perf_counter()
+
+    ins = insert(StockPrices)
+    on_duplicate_ins = ins.on_duplicate_key_update(
+        open=ins.inserted.open, high=ins.inserted.high, low=ins.inserted.low, close=ins.inserted.close,
+        adj_close=ins.inserted.adj_close, volume=ins.inserted.volume
+    )
+
+    # Write each chunk as a single multi-row upsert inside its own transaction
+    for batch in chunks(records, batch_size):
+        batch_start_time = time.perf_counter()
+        with con.begin():
+            con.execute(on_duplicate_ins, batch)
+            if update_watermarks:
+                write_symbol_watermarks(con, batch_watermarks(batch))
+        row_count += len(batch)
+        batch_elapsed = time.perf_counter() - batch_start_time
+        logger.info('Upserted {}/{} rows into stock_prices table ({:.0f} rows/s).'.format(
+            row_count, total_rows, len(batch) / max(batch_elapsed, 1e-9)))
+
+    elapsed = time.perf_counter() - start_time
+    logger.info('Loaded {} rows in {:.2f}s ({:.0f} rows/s).'.format(
+        row_count, elapsed, row_count / max(elapsed, 1e-9)))
+    return row_count
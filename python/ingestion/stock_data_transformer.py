@@ -1,24 +1,50 @@
+import numpy as np
 import pandas as pd
 
+from python.common.common import chunks
 
-def transform_yf_data(data):
-    cols = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-    # Process yf data into appropriate format
-    stock_data_l = []
-    for ticker in data[cols[0]]:
-        d = {}
-        for col in cols:
-            d[col] = data[col][ticker]
-        df = pd.DataFrame(d)
-        df['Symbol'] = ticker
-        stock_data_l.append(df)
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+# Downcast dtypes of the in memory frame, volumes are whole numbers past float32's exact range. Rows written to the
+# DOUBLE columns of fact_stock_prices keep the downloaded float64 values, see transform_yf_data
+PRICE_DTYPES = {'Open': np.float32, 'High': np.float32, 'Low': np.float32, 'Close': np.float32,
+                'Adj Close': np.float32, 'Volume': np.float64}
 
-    join_df = pd.concat(stock_data_l).dropna()
 
-    return join_df
+def _stack_tickers(data, symbols, downcast):
+    # Move the ticker level of the (field, ticker) columns into the rows, one row per date and ticker
+    stacked = data[PRICE_FIELDS].stack(level=1)[PRICE_FIELDS].dropna()
+
+    transformed_df = stacked.astype(PRICE_DTYPES) if downcast else stacked
+    transformed_df['Symbol'] = pd.Categorical(stacked.index.get_level_values(1), categories=symbols)
+    transformed_df.index = stacked.index.get_level_values(0)
+    return transformed_df
+
+
+def iter_transform_yf_data(data, chunk_size, downcast=True):
+    '''
+    transform_yf_data over chunks of chunk_size tickers, so only one chunk's stacked copy is held in memory next to
+    the downloaded data.
+    '''
+    tickers = data.columns.get_level_values(1)
+    # Every chunk shares the categories of all the tickers, so the chunks concatenate into a categorical Symbol
+    symbols = tickers.unique()
+    for ticker_chunk in chunks(list(symbols), chunk_size):
+        yield _stack_tickers(data.loc[:, tickers.isin(ticker_chunk)], symbols, downcast)
+
+
+def transform_yf_data(data, chunk_size=None, downcast=True):
+    '''
+    Reshapes yf.download data with (field, ticker) columns into one row per date and ticker, indexed on date, with
+    a categorical Symbol and float32 prices, or the downloaded float64 prices when downcast is False. Rows with a
+    missing field are dropped. Rows are ordered by date then ticker, within each chunk of chunk_size tickers when it
+    is given.
+    '''
+    if chunk_size is None:
+        return _stack_tickers(data, data.columns.get_level_values(1).unique(), downcast)
+    return pd.concat(iter_transform_yf_data(data, chunk_size, downcast))
 
 
 def join_yf_nasdaq(yf_df, nasdaq_df):
     # Join with df from nasdaq.com to retrieve other attributes
     yf_df['copy_index'] = yf_df.index
-    return yf_df.merge(nasdaq_df, how='left', on='Symbol').rename(columns={'copy_index':'Date'}).set_index('Date')
\ No newline at end of file
+    return yf_df.merge(nasdaq_df, how='left', on='Symbol').rename(columns={'copy_index':'Date'}).set_index('Date')
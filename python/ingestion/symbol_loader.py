@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+from datetime import datetime as dt
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import insert
+
+from schema.data_model import Symbols
+from python.common.common import chunks
+
+logger = logging.getLogger(__name__)
+
+# Mapping of ticker file columns to dim_symbols columns
+SYMBOL_COLUMNS = {
+    'Symbol': 'symbol', 'Name': 'name', 'Market Cap': 'market_cap', 'Country': 'country', 'IPO Year': 'ipo_year',
+    'Sector': 'sector', 'Industry': 'industry', 'Market Type': 'market_type'
+}
+
+
+def content_hash(record):
+    # sha1 of the symbol attributes in column order, numpy values are hashed through their str
+    return hashlib.sha1(
+        json.dumps([record[column] for column in SYMBOL_COLUMNS.values()], default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def to_symbol_records(tickers_df):
+    # Convert the ticker df into a list of dicts keyed on the table columns, a symbol listed twice keeps its last row
+    df = tickers_df[list(SYMBOL_COLUMNS)].rename(columns=SYMBOL_COLUMNS).drop_duplicates('symbol', keep='last')
+    records = df.astype(object).where(df.notnull(), None).to_dict('records')
+    for record in records:
+        record['content_hash'] = content_hash(record)
+    return records
+
+
+def read_symbol_hashes(con):
+    return dict(con.execute(sa.select(Symbols.symbol, Symbols.content_hash)).fetchall())
+
+
+def upsert_symbols(con, tickers_df, batch_size):
+    '''
+    Upserts the symbols of tickers_df batch_size at a time, one multi-row statement per batch, skipping the symbols
+    whose content hash is the same as in dim_symbols.
+    '''
+    records = to_symbol_records(tickers_df)
+    symbol_hashes = read_symbol_hashes(con)
+    changed_records = [record for record in records if symbol_hashes.get(record['symbol']) != record['content_hash']]
+    logger.info('{} of {} symbols changed since the last load'.format(len(changed_records), len(records)))
+
+    date_updated = dt.utcnow()
+    for record in changed_records:
+        record['date_updated'] = date_updated
+
+    ins = insert(Symbols)
+    on_duplicate_ins = ins.on_duplicate_key_update(
+        {column: ins.inserted[column] for column in list(SYMBOL_COLUMNS.values())[1:] + ['date_updated', 'content_hash']}
+    )
+    for batch in chunks(changed_records, batch_size):
+        with con.begin():
+            con.execute(on_duplicate_ins, batch)
+    return len(changed_records)
@@ -1,15 +1,48 @@
 from datetime import datetime as dt
+import json
 import logging
+import os
+import uuid
 
 import pandas as pd
-import sqlalchemy as sa
-from backtesting.custom_datafeed import PandasData
-from backtesting.strategy import *
-import backtrader as bt
+
+from backtesting.data_provider import BacktestDataProvider
+from backtesting.journal import BacktestJournal
+from backtesting.report import save_plot, write_report
+from backtesting.results_store import write_backtest_results
+from backtesting.runner import get_equity_curve, run_backtest
+from backtesting.sweep import build_sweep_tasks, run_sweep
 
 from config_reader import ConfigReader
 from common.mysql_connector import MySqlConnector
-from schema.data_model import ActualisedTable
+
+
+def run_back_testing_sweep(con, data_provider, app_config, logger, run_id, now):
+    sweep_config = app_config.BACK_TESTING['SWEEP']
+
+    tasks = build_sweep_tasks(
+        sweep_config['SYMBOLS'], sweep_config['MODELS'], sweep_config['STRATEGIES'],
+        app_config.BACK_TESTING['PARAMS'], sweep_config['PARAMS']
+    )
+
+    # Load the data of every (symbol, model) at once, it is shared by all the runs on it
+    sweep_data = data_provider.load((symbol, model) for symbol, model, _, _ in tasks)
+
+    results_df = run_sweep(
+        sweep_data, tasks, app_config.BACK_TESTING['INITIAL_CASH'], app_config.BACK_TESTING['COMMISSION'],
+        max_workers=sweep_config['MAX_WORKERS'], engine=sweep_config['ENGINE'], log_level=sweep_config['LOG_LEVEL'],
+        rank_by=sweep_config['RANK_BY']
+    )
+
+    os.makedirs(os.path.dirname(sweep_config['OUTPUT_PATH']), exist_ok=True)
+    results_df.to_csv(sweep_config['OUTPUT_PATH'], index=False)
+    logger.info('Wrote {} ranked backtest results to {}'.format(len(results_df), sweep_config['OUTPUT_PATH']))
+    logger.info('Best run: {}'.format(results_df.head(1).to_dict('records')))
+
+    if app_config.BACK_TESTING['SAVE_RESULTS']:
+        write_backtest_results(
+            con, results_df, run_id, now, sweep_config['ENGINE'], app_config.BACK_TESTING['INITIAL_CASH'],
+            app_config.BACK_TESTING['COMMISSION'])
 
 
 def main():
@@ -20,6 +53,8 @@ def main():
     # Initialise config reader
     app_config = ConfigReader('../configurations/run_config.json')
     now = dt.now()
+    # Groups the results written by this execution of the job
+    run_id = str(uuid.uuid4())
 
     # Initialise database connection
     engine = MySqlConnector(
@@ -31,60 +66,80 @@ def main():
 
     con = engine.con
 
+    data_provider = BacktestDataProvider(
+        con,
+        cache_dir=app_config.BACK_TESTING['DATA_CACHE']['CACHE_DIR'],
+        max_entries=app_config.BACK_TESTING['DATA_CACHE']['MAX_ENTRIES']
+    )
+
+    if app_config.BACK_TESTING['SWEEP']['ENABLED']:
+        run_back_testing_sweep(con, data_provider, app_config, logger, run_id, now)
+        return
+
     symbol = app_config.BACK_TESTING['SYMBOL']
     model = app_config.BACK_TESTING['MODEL']
 
     logger.info('Using Symbol:{} , Model:{}.'.format(symbol, str(model)))
 
-    # Read stock price data from database
-    sql_df = pd.read_sql(
-        sa.select(ActualisedTable.stock_datetime, ActualisedTable.symbol, ActualisedTable.open, ActualisedTable.high, ActualisedTable.low,
-                  ActualisedTable.close, ActualisedTable.adj_close, ActualisedTable.volume, ActualisedTable.future_close) \
-            .where(ActualisedTable.symbol == symbol) \
-            .where(ActualisedTable.model_id == model), con)
+    sql_df = data_provider.get(symbol, model)
 
     opening_stock = sql_df['close'].head(1).values[0]
     closing_stock = sql_df['close'].tail(1).values[0]
     original_return = (closing_stock - opening_stock)/opening_stock
 
-    # Transform stock data into backtrader format
-    data = PandasData(dataname=sql_df)
-
-    # initialise cerebro
-    cerebro = bt.Cerebro()
-
     logger.info('Using strategy: {}'.format(app_config.BACK_TESTING['STRATEGY']))
-
-    # add strategy
-    if app_config.BACK_TESTING['STRATEGY'] == 'FollowTheTrendMA':
-        cerebro.addstrategy(FollowTheTrendMA, app_config.BACK_TESTING['PARAMS']['FollowTheTrendMA'])
-    elif app_config.BACK_TESTING['STRATEGY'] == 'FollowTheTrendBollinger':
-        cerebro.addstrategy(FollowTheTrendBollinger, app_config.BACK_TESTING['PARAMS']['FollowTheTrendBollinger'])
-    elif app_config.BACK_TESTING['STRATEGY'] == 'MeanReversionMinMax':
-        cerebro.addstrategy(MeanReversionMinMax, app_config.BACK_TESTING['PARAMS']['MeanReversionMinMax'])
-    elif app_config.BACK_TESTING['STRATEGY'] == 'MeanReversionBollinger':
-        cerebro.addstrategy(MeanReversionBollinger, app_config.BACK_TESTING['PARAMS']['MeanReversionBollinger'])
-
-
-    # add data to cerebro
-    cerebro.adddata(data)
-
-    # set configurations
-    cerebro.broker.setcash(app_config.BACK_TESTING['INITIAL_CASH'])
-    cerebro.broker.setcommission(app_config.BACK_TESTING['COMMISSION'])
-    cerebro.broker.set_coc(True)
-
-    start_portfolio = cerebro.broker.getvalue()
-    logger.info('Starting Portfolio Value: %.2f' % start_portfolio)
-
-    cerebro.run()
-
-    end_portfolio = cerebro.broker.getvalue()
+    logger.info('Starting Portfolio Value: %.2f' % app_config.BACK_TESTING['INITIAL_CASH'])
+
+    report_config = app_config.BACK_TESTING['REPORT']
+    journal_config = app_config.BACK_TESTING['JOURNAL']
+    journal = BacktestJournal(capacity=len(sql_df)) if journal_config['ENABLED'] else None
+
+    cerebro, result = run_backtest(
+        data_provider.feed(symbol, model), app_config.BACK_TESTING['STRATEGY'], app_config.BACK_TESTING['PARAMS'][app_config.BACK_TESTING['STRATEGY']],
+        app_config.BACK_TESTING['INITIAL_CASH'], app_config.BACK_TESTING['COMMISSION'],
+        log_level=app_config.BACK_TESTING['LOG_LEVEL'], journal=journal,
+        # observers are only needed when the run is plotted
+        stdstats=not report_config['HEADLESS'] or report_config['SAVE_PNG']
+    )
+
+    if journal is not None:
+        journal_paths = journal.flush(
+            os.path.join(journal_config['OUTPUT_DIR'], '{}_{}_{}'.format(symbol, model, app_config.BACK_TESTING['STRATEGY'])),
+            file_format=journal_config['FORMAT'])
+        logger.info('Wrote backtest journal to {}'.format(', '.join(journal_paths)))
+
+    start_portfolio = result['start_value']
+    end_portfolio = result['end_value']
     logger.info('Final Portfolio Value: %.2f' % end_portfolio)
     logger.info('Portfolio %.2f -> %.2f, Perc change %.2f' % (start_portfolio, end_portfolio, (end_portfolio-start_portfolio)/start_portfolio*100)+'%')
     logger.info('Symbol %s  %.2f -> %.2f, Perc change %.2f' % (symbol, opening_stock, closing_stock, original_return*100)+'%')
-
-    cerebro.plot(figsize=(16,14), dpi=100)
+    logger.info('Sharpe %.2f, Sortino %.2f, Max drawdown %.2f%%, Turnover %.2f, Win rate %.2f, Exposure %.2f%%' % (
+        result['sharpe_ratio'], result['sortino_ratio'], result['max_drawdown_perc'], result['turnover'],
+        result['win_rate'], result['exposure_perc']))
+
+    if app_config.BACK_TESTING['SAVE_RESULTS']:
+        results_df = pd.DataFrame([dict(
+            symbol=symbol, model_id=model, strategy=app_config.BACK_TESTING['STRATEGY'],
+            params=json.dumps(app_config.BACK_TESTING['PARAMS'][app_config.BACK_TESTING['STRATEGY']]), **result
+        )])
+        write_backtest_results(
+            con, results_df, run_id, now, 'backtrader', app_config.BACK_TESTING['INITIAL_CASH'],
+            app_config.BACK_TESTING['COMMISSION'])
+
+    if not report_config['HEADLESS']:
+        cerebro.plot(figsize=(16,14), dpi=100)
+        return
+
+    output_prefix = os.path.join(report_config['OUTPUT_DIR'], '{}_{}_{}'.format(symbol, model, app_config.BACK_TESTING['STRATEGY']))
+    summary = dict(
+        symbol=symbol, model_id=model, strategy=app_config.BACK_TESTING['STRATEGY'],
+        params=app_config.BACK_TESTING['PARAMS'][app_config.BACK_TESTING['STRATEGY']],
+        run_id=run_id, run_datetime=now, **result
+    )
+    report_paths = write_report(output_prefix, get_equity_curve(cerebro), summary)
+    if report_config['SAVE_PNG']:
+        report_paths.append(save_plot(cerebro, output_prefix + '.png', figsize=(16,14), dpi=100))
+    logger.info('Wrote backtest report to {}'.format(', '.join(report_paths)))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,15 @@
 from datetime import datetime as dt
-import yfinance as yf
 import sqlalchemy as sa
 from sqlalchemy.sql.expression import func
 import logging
 
 from python.ingestion.stock_data_transformer import transform_yf_data
+from python.ingestion.stock_data_loader import drop_loaded_rows, load_stock_prices
+from python.ingestion.price_downloader import ChunkedDownloader, group_tickers_by_start_date, make_price_provider
 from config_reader import ConfigReader
 from schema.data_model import StockPrices, Symbols
 from common.mysql_connector import MySqlConnector
+from common.etl_watermarks import read_symbol_watermarks
 
 def main():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
@@ -38,45 +40,47 @@ def main():
     if (app_config.DATA_INGESTION['INITIAL_RUN']) and (app_config.DATA_INGESTION['DOWNLOAD_PREVIOUS_HISTORICAL_DATA']):
         raise Exception('Config for Initial Run and Download previous historical data cannot be both set to True')
 
-    # Set start date to stock start date if it is initial run or downloading more historical data
-    if (app_config.DATA_INGESTION['INITIAL_RUN']) or (app_config.DATA_INGESTION['DOWNLOAD_PREVIOUS_HISTORICAL_DATA']):
-        start_date = app_config.DATA_INGESTION['STOCK_START_DATE']
-    else:
-        start_date = con.execute(sa.select(func.max(StockPrices.stock_datetime))).fetchone()[0]  # query mysql for latest date +1
-
-    # Delete any data after start date (due to time zone difference some records might need to be removed)
-    logger.info('Emptying out stock data from table from {}'.format(str(start_date)))
-    con.execute(
-        sa.delete(StockPrices).where(StockPrices.stock_datetime >= start_date)
-    )
-
-    logger.info('Downloading stock data from {}'.format(str(start_date)))
-
-    # If adhoc run for downloading more historical data, set end date to earliest record in database
+    # Downloading more historical data fetches every ticker from the stock start date up to the earliest record in
+    # the database, otherwise each ticker is fetched from its own watermark, or from the stock start date when it was
+    # never loaded (always the case on the initial run)
     if app_config.DATA_INGESTION['DOWNLOAD_PREVIOUS_HISTORICAL_DATA']:
+        symbol_watermarks = {}
         end_date = con.execute(sa.select(func.min(StockPrices.stock_datetime))).fetchone()[0]
-        data = yf.download(ticker_list, start=start_date, end=end_date)
     else:
-        data = yf.download(ticker_list, start=start_date)
-
-    logger.info('Shape of data is {}, {}'.format(str(data.shape[0]), str(data.shape[1])))
-
-    # Transform yf data to appropriate format
-    logger.info('Transforming YF data to appropriate format...')
-    transformed_df = transform_yf_data(data)
+        symbol_watermarks = read_symbol_watermarks(con, ticker_list)
+        end_date = None
+    start_date_groups = group_tickers_by_start_date(
+        ticker_list, symbol_watermarks, app_config.DATA_INGESTION['STOCK_START_DATE'])
+
+    download_config = app_config.DATA_INGESTION['DOWNLOAD']
+    downloader = ChunkedDownloader(
+        make_price_provider(download_config),
+        chunk_size=download_config['CHUNK_SIZE'],
+        max_workers=download_config['MAX_WORKERS'],
+        max_retries=download_config['MAX_RETRIES'],
+        backoff_seconds=download_config['BACKOFF_SECONDS']
+    )
 
-    logger.info('Writing data to database...')
+    # Transform and load every chunk of tickers as soon as it is downloaded, one download per start date
     row_count = 0
-
-    # Write to db
-    for index, row in transformed_df.iterrows():
-        ins = sa.insert(StockPrices).values(
-            symbol=row.Symbol, stock_datetime=index, open=row.Open, high=row.High, low=row.Low, close=row.Close,
-            adj_close=row['Adj Close'], volume=row.Volume
-        )
-        con.execute(ins)
-        row_count += 1
-        logger.info('Inserted {} rows into stock_prices table.'.format(str(row_count)))
+    for start_date, tickers in start_date_groups.items():
+        logger.info('Downloading {} tickers from {}'.format(len(tickers), str(start_date.date())))
+        for data in downloader.iter_chunks(tickers, start_date, end_date):
+            logger.info('Shape of data is {}, {}'.format(str(data.shape[0]), str(data.shape[1])))
+            if data.empty:
+                continue
+
+            # Transform yf data to appropriate format, without the rows that are already loaded. Prices are not
+            # downcast, so re-loaded rows compare equal to the stored DOUBLE values and are left untouched
+            transformed_df = drop_loaded_rows(transform_yf_data(data, downcast=False), symbol_watermarks)
+
+            row_count += load_stock_prices(
+                con, transformed_df, batch_size=app_config.DATA_INGESTION['BATCH_SIZE'], update_watermarks=True)
+
+    logger.info('Wrote {} rows to database'.format(row_count))
+    if downloader.failed_tickers:
+        logger.error('Failed to download {} tickers: {}'.format(
+            len(downloader.failed_tickers), ' '.join(downloader.failed_tickers)))
     con.close()
 
 if __name__ == "__main__":
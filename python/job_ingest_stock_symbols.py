@@ -1,12 +1,11 @@
 from datetime import datetime as dt
-from sqlalchemy.dialects.mysql import insert
 import pandas as pd
 import logging
 
 from config_reader import ConfigReader
-from schema.data_model import Symbols
 from common.mysql_connector import MySqlConnector
 from python.ingestion.ticker_reader import read_stock_tickers, cleanse_tickers, read_process_additional_tickers
+from python.ingestion.symbol_loader import upsert_symbols
 
 
 def main():
@@ -40,18 +39,9 @@ def main():
 
     combined_df = pd.concat([stock_ticker_cleansed, additional_tickers_df])
 
-    # Write to db
-    for index, row in combined_df.iterrows():
-        ins = insert(Symbols).values(
-            symbol=row.Symbol, name=row.Name, market_cap=row['Market Cap'], country=row.Country, ipo_year=row['IPO Year'],
-            sector=row.Sector, industry=row.Industry, market_type=row['Market Type']
-        )
-        on_duplicate_ins = ins.on_duplicate_key_update(
-            symbol=row.Symbol, name=row.Name, market_cap=row['Market Cap'], country=row.Country, ipo_year=row['IPO Year'],
-            sector=row.Sector, industry=row.Industry, market_type=row['Market Type'], date_updated=dt.utcnow()
-        )
-
-        con.execute(on_duplicate_ins)
+    # Write the new and changed symbols to db
+    row_count = upsert_symbols(con, combined_df, batch_size=app_config.DATA_INGESTION['BATCH_SIZE'])
+    logger.info('Wrote {} symbols to database'.format(row_count))
     con.close()
 
 if __name__ == "__main__":
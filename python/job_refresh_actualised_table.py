@@ -0,0 +1,122 @@
+from datetime import datetime as dt
+import logging
+
+import sqlalchemy as sa
+
+from config_reader import ConfigReader
+from common.mysql_connector import MySqlConnector
+from common.etl_watermarks import read_high_water_mark, write_high_water_mark
+from schema.data_model import ActualisedTable, StockPrediction
+
+ACTUALISED_TABLE_NAME = ActualisedTable.__tablename__
+# Used as the high water mark on the first refresh, so every existing prediction is merged
+INITIAL_HIGH_WATER_MARK = dt(1970, 1, 1)
+
+# Same select as the initial CREATE TABLE in sql/create_tables.sql, restricted to predictions created since the high
+# water mark on either side of the prediction self join. Columns are listed explicitly so new columns on the dim tables
+# do not shift the insert
+MERGE_ACTUALISED_TABLE = '''
+INSERT INTO tb_stock_actual_pred (
+    stock_datetime, open, high, low, adj_close, volume, close, predicted_close, future_close
+    , model_id, symbols_used, timesteps, predict_gap, epochs, dropout, layers, created_date, min_train_date
+    , max_train_date, input_layout
+    , symbol, name, market_cap, country, ipo_year, sector, industry, market_type, date_updated
+)
+SELECT
+fact_stock_prices.stock_datetime
+, fact_stock_prices.open
+, fact_stock_prices.high
+, fact_stock_prices.low
+, fact_stock_prices.adj_close
+, fact_stock_prices.volume
+, fact_stock_prices.close
+, fact_stock_prediction.predicted_close
+, pred.predicted_close future_close
+, dim_models.model_id
+, dim_models.symbols_used
+, dim_models.timesteps
+, dim_models.predict_gap
+, dim_models.epochs
+, dim_models.dropout
+, dim_models.layers
+, dim_models.created_date
+, dim_models.min_train_date
+, dim_models.max_train_date
+, dim_models.input_layout
+, dim_symbols.symbol
+, dim_symbols.name
+, dim_symbols.market_cap
+, dim_symbols.country
+, dim_symbols.ipo_year
+, dim_symbols.sector
+, dim_symbols.industry
+, dim_symbols.market_type
+, dim_symbols.date_updated
+from fact_stock_prices
+inner join fact_stock_prediction on fact_stock_prices.stock_datetime = fact_stock_prediction.STOCK_DATETIME
+    and fact_stock_prices.symbol = fact_stock_prediction.symbol
+inner join fact_stock_prediction pred on fact_stock_prediction.stock_datetime = pred.prediction_datetime
+    and fact_stock_prediction.symbol = pred.symbol
+    and fact_stock_prediction.MODEL_ID = pred.MODEL_ID
+inner join dim_models on dim_models.model_id = fact_stock_prediction.model_id
+inner join dim_symbols on dim_symbols.symbol = fact_stock_prices.SYMBOL
+where {side}.created_date >= :high_water_mark
+ON DUPLICATE KEY UPDATE
+    tb_stock_actual_pred.open = VALUES(open)
+    , tb_stock_actual_pred.high = VALUES(high)
+    , tb_stock_actual_pred.low = VALUES(low)
+    , tb_stock_actual_pred.adj_close = VALUES(adj_close)
+    , tb_stock_actual_pred.volume = VALUES(volume)
+    , tb_stock_actual_pred.close = VALUES(close)
+    , tb_stock_actual_pred.predicted_close = VALUES(predicted_close)
+    , tb_stock_actual_pred.future_close = VALUES(future_close)
+'''
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+    logger = logging.getLogger('job_refresh_actualised_table.py')
+    logger.info('Starting Job Refresh Actualised Table...')
+
+    # Initialise config reader
+    app_config = ConfigReader('../configurations/run_config.json')
+
+    logger.info('Connecting to database...')
+    # Initialise database connection
+    engine = MySqlConnector(
+        host=app_config.DATABASE['HOST'],
+        user=app_config.DATABASE['USER'],
+        password=app_config.DATABASE['PASSWORD'],
+        database=app_config.DATABASE['DATABASE']
+    )
+
+    con = engine.con
+
+    high_water_mark = read_high_water_mark(con, ACTUALISED_TABLE_NAME)
+    # Read the next high water mark before merging, predictions written while the merge runs are picked up next time
+    new_high_water_mark = con.execute(sa.select(sa.func.max(StockPrediction.created_date))).fetchone()[0]
+
+    if new_high_water_mark is None:
+        logger.info('No predictions to refresh {} with'.format(ACTUALISED_TABLE_NAME))
+        con.close()
+        return
+
+    logger.info('Merging predictions created since {} into {}'.format(
+        str(high_water_mark or 'the beginning'), ACTUALISED_TABLE_NAME))
+
+    with con.begin():
+        row_count = 0
+        # A new actualised row needs both the prediction for its date and the prediction made on its date, so merge
+        # rows where either of them is new
+        for side in ('fact_stock_prediction', 'pred'):
+            result = con.execute(sa.text(MERGE_ACTUALISED_TABLE.format(side=side)),
+                                 {'high_water_mark': high_water_mark or INITIAL_HIGH_WATER_MARK})
+            row_count += result.rowcount
+        write_high_water_mark(con, ACTUALISED_TABLE_NAME, new_high_water_mark)
+
+    logger.info('Merged predictions into {} ({} rows affected), high water mark is now {}'.format(
+        ACTUALISED_TABLE_NAME, row_count, str(new_high_water_mark)))
+    con.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
-import pandas as pd
-import numpy as np
-import sqlalchemy as sa
 import logging
-from keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
 
 from python.common.mysql_connector import MySqlConnector
-from schema.data_model import StockPrices, Symbols, Models, StockPrediction
+from python.rnn.windowing import build_model_inputs, model_input_shapes
+from python.rnn.partition import SymbolPartition, count_dummy_columns, encode_non_numeric_features
+from python.rnn.inference import predict_in_batches
+from python.rnn.scaling import MinMaxScaling
+from python.rnn.model_registry import ModelRegistry
+from python.rnn.prediction_store import read_series_stats, read_symbol_categories, read_prediction_watermarks, \
+    read_last_predictable_dates, read_window_start_dates, read_prediction_dataset, upsert_predictions
 from config_reader import ConfigReader
 
 
@@ -28,100 +29,142 @@ def main():
 
     con = engine.con
 
-    # Retrieve all model id from database as a list
-    model_list_row = con.execute(
-        sa.select(Models.model_id)
-    ).fetchall()
-    model_list = [i[0] for i in model_list_row]
-    model_list = [29,30]
+    # Models are loaded lazily and kept in memory up to the registry's size cap
+    registry_config = app_config.RNN['MODEL_REGISTRY']
+    model_registry = ModelRegistry(
+        con, '../lstm_models', max_bytes=registry_config['MAX_BYTES'], backend=registry_config['BACKEND'],
+        num_threads=registry_config['NUM_THREADS'])
+
+    # Retrieve all model id from database as a list, optionally limited to the configured models
+    model_list = model_registry.model_ids()
+    if registry_config['MODEL_IDS']:
+        model_list = [model_id for model_id in model_list if model_id in registry_config['MODEL_IDS']]
     logger.info('Generating predictions for models: {}'.format(' '.join([str(model) for model in model_list])))
 
-    # Retrieve selected model id for predict stock prices
-    for model_id in model_list:
-        # Retrieve the corresponding timesteps and predict_gap
-        model_row = con.execute(
-            sa.select(Models.timesteps, Models.predict_gap)
-            .where(Models.model_id == model_id)
-        ).fetchall()[0]
+    # Shortlist list of stock to train model on
+    shortlist_stock_stmt = app_config.RNN['SHORTLIST_STOCK_QUERY']
+
+    shortlist_stock = con.execute(shortlist_stock_stmt).fetchall()
+    symbol_list = [i[0] for i in shortlist_stock]
 
-        timesteps, predict_gap = model_row
+    # Scaling range and latest price date of each symbol, and the categories used for one hot encoding
+    series_stats = read_series_stats(con, symbol_list)
+    categories = read_symbol_categories(con, symbol_list)
+    symbol_list = [symbol for symbol in symbol_list if symbol in series_stats]
 
-        logger.info('Running model %s with timesteps: %s, predict_gap: %s' % (model_id, timesteps, predict_gap))
+    incremental = app_config.RNN['PREDICT_INCREMENTAL']
+    if incremental:
+        last_predictable_dates = read_last_predictable_dates(con, symbol_list)
 
-        # Loading LSTM model for the corresponding model ID
-        model = load_model('../lstm_models/model_{}'.format(model_id))
+    # Number of one hot columns of the non numeric features
+    n_static = count_dummy_columns(categories)
 
-        # Shortlist list of stock to train model on
-        shortlist_stock_stmt = app_config.RNN['SHORTLIST_STOCK_QUERY']
+    # Load every model and trace its prediction once before the first symbol is predicted
+    if registry_config['WARM_UP']:
+        model_registry.warm_up(model_list)
 
-        shortlist_stock = con.execute(shortlist_stock_stmt).fetchall()
-        symbol_list = [i[0] for i in shortlist_stock]
+    # Retrieve selected model id for predict stock prices
+    for model_id in model_list:
+        # Retrieve the corresponding timesteps, predict_gap and input layout
+        _, timesteps, predict_gap, input_layout = model_registry.spec(model_id)
+
+        logger.info('Running model %s with timesteps: %s, predict_gap: %s, input layout: %s' % (
+            model_id, timesteps, predict_gap, input_layout))
+
+        if incremental:
+            # Only predict dates after the latest stored prediction, reading just enough history to fill the windows
+            # Predictions stop at the second to last price, so a symbol has new dates once that is past its watermark
+            watermarks = read_prediction_watermarks(con, model_id, symbol_list)
+            model_symbol_list = [
+                symbol for symbol in symbol_list
+                if symbol not in watermarks or (
+                    symbol in last_predictable_dates and last_predictable_dates[symbol] > watermarks[symbol])
+            ]
+            start_dates = read_window_start_dates(
+                con, {symbol: watermarks[symbol] for symbol in model_symbol_list if symbol in watermarks},
+                lookback=timesteps + predict_gap - 1)
+        else:
+            watermarks = {}
+            model_symbol_list = symbol_list
+            start_dates = {}
+
+        if not model_symbol_list:
+            logger.info('No new dates to predict for model %s' % model_id)
+            continue
+
+        logger.info('Predicting {} symbols with model {}'.format(len(model_symbol_list), model_id))
+
+        # LSTM model for the corresponding model ID, loaded once and kept in the registry, fail before reading the
+        # data if the model cannot take the inputs built from its dim_models config
+        model, _, symbol_scalers, _ = model_registry.get(model_id)
+        model_registry.check_signature(model_id, model_input_shapes(timesteps, n_static, input_layout))
+
+        # Scaling the model was trained with, symbols without one are scaled over their full history
+        unscaled_symbols = [symbol for symbol in model_symbol_list if symbol not in symbol_scalers]
+        if unscaled_symbols:
+            logger.info('No saved scaling for {} symbols of model {}, scaling them over their full history'.format(
+                len(unscaled_symbols), model_id))
 
         # Predicting dataset
-        sql_df = pd.read_sql(
-            sa.select(
-                StockPrices.stock_datetime, StockPrices.symbol, StockPrices.close, StockPrices.volume,
-                Symbols.market_type,
-                Symbols.sector) \
-                .join(Symbols) \
-                .where(StockPrices.symbol.in_([i[0] for i in shortlist_stock])), con)
+        sql_df = read_prediction_dataset(con, model_symbol_list, start_dates)
 
         # One hot encoding
-        sql_df = sql_df.join(pd.get_dummies(sql_df['sector'], prefix='sector_', drop_first=True)).drop('sector', axis=1)
-        sql_df = sql_df.join(pd.get_dummies(sql_df['market_type'], prefix='market_type_', drop_first=True)).drop(
-            'market_type', axis=1)
-
-        for symbol in symbol_list:
-            logger.info('Predicting symbol %s with model %s...' % (symbol, model_id))
-            # Initialising scalers
-            sc_close = MinMaxScaler(feature_range=(0, 1))
-            sc_volume = MinMaxScaler(feature_range=(0, 1))
-
-            # Scale numeric data with min max scaler
-            scaled_close = sc_close.fit_transform(sql_df[sql_df['symbol'] == symbol]['close'].values.reshape(-1, 1))
-            scaled_volume = sc_volume.fit_transform(sql_df[sql_df['symbol'] == symbol]['volume'].values.reshape(-1, 1))
-
-            # Duplicating non numeric features by timestep and creating
-            non_numeric_features = []
-            for row in sql_df[sql_df['symbol'] == symbol].select_dtypes(include=['uint8']).values:
-                row_l = []
-                for col in row:
-                    row_l.append([col] * timesteps)
-                non_numeric_features.append(row_l)
-
-            X_test = []
-
-            # Creating a data structure with time-steps in a 3d array form
-            for i in range(timesteps + predict_gap, scaled_close.shape[0]):
-                X_test.append(
-                    [scaled_close[i - timesteps - predict_gap:i - predict_gap, 0],
-                     scaled_volume[i - timesteps - predict_gap:i - predict_gap, 0]
-                     ] + non_numeric_features[i]
-                )
-            X_test = np.array(X_test)
-            X_test = np.array(X_test).transpose(0, 2, 1)
-
-            # Predict stock price and inverse normalisation
-            pred_pre_scaled = model.predict(X_test)
-            pred_stock_price = sc_close.inverse_transform(pred_pre_scaled)
-            flatten_pred_stock_price = [i[0] for i in pred_stock_price]
+        sql_df = encode_non_numeric_features(sql_df, categories)
 
-            # Retrieve actual stock price date
-            stock_datetime = sql_df[sql_df['symbol'] == symbol][timesteps + predict_gap - 1: -1]['stock_datetime']
+        # Partition the dataset by symbol once
+        partition = SymbolPartition(sql_df)
 
-            # Calculate prediction date
-            prediction_datetime = sql_df[sql_df['symbol'] == symbol][timesteps - 1:-predict_gap - 1]['stock_datetime']
+        inputs_list = []
+        close_scalers = []
 
-            # Zip stock datetime and predicted stock price in order to iterate
-            date_price = zip(stock_datetime, prediction_datetime, flatten_pred_stock_price)
+        for symbol in model_symbol_list:
+            logger.info('Preparing symbol %s for model %s...' % (symbol, model_id))
+            series = partition.get(symbol)
+            stats = series_stats[symbol]
 
-            # Insert into datebase
-            for stock_dt, pred_dt, price in date_price:
-                ins = sa.insert(StockPrediction).values(
-                    model_id=model_id, symbol=symbol, stock_datetime=stock_dt, prediction_datetime=pred_dt, predicted_close=price
-                )
+            # Scale numeric data with the model's min max scaling, or over the full history of the symbol
+            if symbol in symbol_scalers:
+                sc_close, sc_volume = symbol_scalers[symbol]
+            else:
+                sc_close = MinMaxScaling.from_range(stats.min_close, stats.max_close)
+                sc_volume = MinMaxScaling.from_range(stats.min_volume, stats.max_volume)
+            scaled_close = sc_close.transform(series.close)
+            scaled_volume = sc_volume.transform(series.volume)
 
-                con.execute(ins)
+            # Creating a data structure with time-steps in a 3d array form, non numeric features are laid out the
+            # same way as the model was trained on
+            inputs_list.append(build_model_inputs(
+                scaled_close, scaled_volume, series.non_numeric_features, timesteps, predict_gap, input_layout))
+            close_scalers.append(sc_close)
+
+        # Predict the windows of every symbol in one go and split the results back per symbol
+        pred_pre_scaled_list = predict_in_batches(model, inputs_list, app_config.RNN['PREDICT_BATCH_SIZE'])
+
+        prediction_records = []
+        for symbol, sc_close, pred_pre_scaled in zip(model_symbol_list, close_scalers, pred_pre_scaled_list):
+            series = partition.get(symbol)
+
+            # Inverse normalisation
+            pred_stock_price = sc_close.inverse_transform(pred_pre_scaled[:, 0])
+
+            # Retrieve actual stock price date
+            stock_datetime = series.stock_datetime[timesteps + predict_gap - 1: -1]
+
+            # Calculate prediction date
+            prediction_datetime = series.stock_datetime[timesteps - 1:-predict_gap - 1]
+
+            for stock_dt, pred_dt, price in zip(stock_datetime, prediction_datetime, pred_stock_price):
+                # Skip dates that were already predicted
+                if symbol in watermarks and stock_dt <= watermarks[symbol]:
+                    continue
+                prediction_records.append(dict(
+                    model_id=model_id, symbol=symbol, stock_datetime=stock_dt, prediction_datetime=pred_dt,
+                    predicted_close=float(price)
+                ))
+
+        # Upsert into database
+        row_count = upsert_predictions(con, prediction_records, app_config.RNN['PREDICT_WRITE_BATCH_SIZE'])
+        logger.info('Upserted {} predictions for model {}'.format(row_count, model_id))
 
 if __name__ == "__main__":
     main()
@@ -4,17 +4,87 @@ import numpy as np
 import logging
 
 import sqlalchemy as sa
-from keras.models import Sequential
-from keras.layers import Dense
-from keras.layers import LSTM
-from keras.layers import Dropout
-from sklearn.preprocessing import MinMaxScaler
 
 from python.common.mysql_connector import MySqlConnector
+from python.rnn.windowing import build_model_inputs, build_targets, model_input_shapes
+from python.rnn.partition import SymbolPartition, encode_non_numeric_features
+from python.rnn.dataset_cache import DatasetCache
+from python.rnn.grid_scheduler import train_grid
+from python.rnn.prediction_store import read_series_stats, read_symbol_categories
+from python.rnn.scaling import MinMaxScaling, symbol_scalers_from_stats
+from python.rnn.streaming import SqlWindowStream, read_training_min_date, read_training_max_date
+from python.rnn.window_store import WindowStore, prune_window_stores
 from schema.data_model import StockPrices, Symbols, Models
 from config_reader import ConfigReader
 
 
+def scale_partition(partition):
+    # Feature Scaling, scaled series do not depend on the window config so they are computed once per symbol. Returns
+    # the scaled series and the (close, volume) scaling of every symbol, which is saved with the models
+    scaled_series = []
+    symbol_scalers = {}
+    for symbol, series in partition:
+        # Scale numeric data with min max scaling over the symbol's training history
+        sc_close = MinMaxScaling.fit(series.close)
+        sc_volume = MinMaxScaling.fit(series.volume)
+        scaled_series.append((sc_close.transform(series.close), sc_volume.transform(series.volume),
+                              series.non_numeric_features))
+        symbol_scalers[symbol] = (sc_close, sc_volume)
+    return scaled_series, symbol_scalers
+
+
+def build_training_set(scaled_series, timesteps, predict_gap, input_layout):
+    inputs_list = []
+    y_train_list = []
+
+    # Iterate each stock and create steps individually
+    for scaled_close, scaled_volume, non_numeric_features in scaled_series:
+        # Creating a data structure with time-steps in a 3d array form, non numeric features are either repeated on
+        # every timestep of the window or kept as a separate input depending on the input layout
+        inputs_list.append(
+            build_model_inputs(scaled_close, scaled_volume, non_numeric_features, timesteps, predict_gap, input_layout))
+        y_train_list.append(build_targets(scaled_close, timesteps, predict_gap))
+
+    return tuple(np.concatenate(arrays) for arrays in zip(*inputs_list)) + (np.concatenate(y_train_list),)
+
+
+def write_training_set(window_store, scaled_series, timesteps, predict_gap, input_layout):
+    # Same windows as build_training_set written to the store one symbol at a time, never concatenated in memory
+    n_samples = sum(max(len(scaled_close) - timesteps - predict_gap, 0) for scaled_close, _, _ in scaled_series)
+    input_shapes = model_input_shapes(timesteps, scaled_series[0][2].shape[1], input_layout)
+    window_store.write(
+        ((build_model_inputs(scaled_close, scaled_volume, non_numeric_features, timesteps, predict_gap, input_layout),
+          build_targets(scaled_close, timesteps, predict_gap))
+         for scaled_close, scaled_volume, non_numeric_features in scaled_series),
+        n_samples, input_shapes)
+
+
+def load_training_data(con, symbol_list, max_date, categories, logger):
+    # Loads the whole training data in memory, returns the scaled series and scaling of every symbol and the first date
+    # of the data. Static features are encoded on the categories of every symbol, as the predictor does
+    # Read from database filter on shortlist tickers
+    sql_df = pd.read_sql(
+        sa.select(
+            StockPrices.stock_datetime, StockPrices.symbol, StockPrices.close, StockPrices.volume, Symbols.market_type,
+            Symbols.sector) \
+            .join(Symbols) \
+            .where(StockPrices.symbol.in_(symbol_list)) \
+            .where(StockPrices.stock_datetime <= max_date), con)
+
+    min_date = str(min(sql_df['stock_datetime']))
+
+    logger.info('Dataset size is {} rows'.format(len(sql_df)))
+
+    # One hot encoding
+    sql_df = encode_non_numeric_features(sql_df, categories)
+
+    # Partition the dataset by symbol once
+    partition = SymbolPartition(sql_df)
+
+    scaled_series, symbol_scalers = scale_partition(partition)
+    return scaled_series, symbol_scalers, min_date
+
+
 def main():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
     logger = logging.getLogger('job_rnn_model_trainer.py')
@@ -46,23 +116,8 @@ def main():
     else:
         max_date = datetime.now()
 
-    # Read from database filter on shortlist tickers
-    sql_df = pd.read_sql(
-        sa.select(
-            StockPrices.stock_datetime, StockPrices.symbol, StockPrices.close, StockPrices.volume, Symbols.market_type,
-            Symbols.sector) \
-            .join(Symbols) \
-            .where(StockPrices.symbol.in_([i[0] for i in shortlist_stock])) \
-            .where(StockPrices.stock_datetime <= max_date), con)
-
-    min_date = str(min(sql_df['stock_datetime']))
-
-    logger.info('Dataset size is {} rows'.format(len(sql_df)))
-
-    # One hot encoding
-    sql_df = sql_df.join(pd.get_dummies(sql_df['sector'], prefix='sector_', drop_first=True)).drop('sector', axis=1)
-    sql_df = sql_df.join(pd.get_dummies(sql_df['market_type'], prefix='market_type_', drop_first=True)).drop(
-        'market_type', axis=1)
+    # Datasets are cached on the last date of the training data, so runs without a fixed max date still share them
+    data_max_date = read_training_max_date(con, symbol_list, max_date)
 
     symbols_used = ' '.join(symbol_list)
 
@@ -70,99 +125,89 @@ def main():
     # Control parameters are (60, 1, 50, 0.2, 4, 32),
     param_list = app_config.RNN['MODEL_PARAMS']
 
-    for timesteps, predict_gap, epochs, dropout, layers, batch_size in param_list:
-        logger.info('Training model on timesteps: %s, predict_gap: %s, epochs: %s, dropout: %s, layers: %s, batch_size: %s' % (
-            timesteps, predict_gap, epochs, dropout, layers, batch_size
-        ))
-        # Feature Scaling
-        sc_close = MinMaxScaler(feature_range=(0, 1))
-        sc_volume = MinMaxScaler(feature_range=(0, 1))
-        symbol_list = sql_df['symbol'].unique()
-
-        X_train_list = []
-        y_train_list = []
-
-        # Iterate each stock and create steps individually
-        for symbol in symbol_list:
-            X_train = []
-            y_train = []
-
-            # Scale numeric data with min max scaler
-            scaled_close = sc_close.fit_transform(sql_df[sql_df['symbol'] == symbol]['close'].values.reshape(-1, 1))
-            scaled_volume = sc_volume.fit_transform(sql_df[sql_df['symbol'] == symbol]['volume'].values.reshape(-1, 1))
-
-            # Duplicating non numeric features by timestep and creating
-            non_numeric_features = []
-            for row in sql_df[sql_df['symbol'] == symbol].select_dtypes(include=['uint8']).values:
-                row_l = []
-                for col in row:
-                    row_l.append([col] * timesteps)
-                non_numeric_features.append(row_l)
-
-            # Creating a data structure with time-steps in a 3d array form
-            for i in range(timesteps + predict_gap, scaled_close.shape[0]):
-                X_train.append(
-                    [scaled_close[i - timesteps - predict_gap:i - predict_gap, 0],
-                     scaled_volume[i - timesteps - predict_gap:i - predict_gap, 0]
-                     ] + non_numeric_features[i]
-                )
-                y_train.append(scaled_close[i, 0])
-
-            X_train, y_train = np.array(X_train), np.array(y_train)
-            X_train = np.array(X_train).transpose((0, 2, 1))
-            X_train_list.append(X_train)
-            y_train_list.append(y_train)
-
-        combined_X_train = np.concatenate(X_train_list)
-        combined_y_train = np.concatenate(y_train_list)
-
-
-        model = Sequential()
-
-        # 1st layer
-        model.add(LSTM(units=50, return_sequences=True, input_shape=(combined_X_train.shape[1], combined_X_train.shape[2])))
-        model.add(Dropout(dropout))
-
-        if layers == 4:
-            # 2nd layer
-            model.add(LSTM(units=50, return_sequences=True))
-            model.add(Dropout(dropout))
-
-            # 3rd layer
-            model.add(LSTM(units=50, return_sequences=True))
-            model.add(Dropout(dropout))
-
-        # 4th layer
-        model.add(LSTM(units=50))
-        model.add(Dropout(dropout))
-
-        # Adding the output layer
-        model.add(Dense(units=1))
-
-        # Compiling the RNN
-        model.compile(optimizer='adam', loss='mean_squared_error')
-
-        # Fitting the RNN to the Training set
-        model.fit(combined_X_train, combined_y_train, epochs=epochs, batch_size=batch_size)
+    # Whether static features are repeated on every timestep or fed to a separate input branch
+    input_layout = app_config.RNN['INPUT_LAYOUT']
+    logger.info('Training models with the {} input layout'.format(input_layout))
+
+    streaming_config = app_config.RNN['STREAMING']
+    window_store_config = app_config.RNN['WINDOW_STORE']
+    max_workers = app_config.RNN['GRID']['MAX_WORKERS']
+    # Categories of the static features of every shortlist symbol, so the dummy columns match the predictor's even for
+    # symbols without prices before max_date
+    categories = read_symbol_categories(con, symbol_list)
+    if streaming_config['ENABLED']:
+        # Stream the windows from the database symbol by symbol instead of loading the whole shortlist
+        min_date = str(read_training_min_date(con, symbol_list, max_date))
+        # Scaling range of each symbol from a SQL aggregate, so it is known before the symbol is streamed
+        symbol_scalers = symbol_scalers_from_stats(read_series_stats(con, symbol_list, max_date))
+        logger.info('Streaming training data from {} in chunks of {} rows'.format(min_date, streaming_config['CHUNK_ROWS']))
+
+        def get_window_stream(timesteps, predict_gap):
+            return SqlWindowStream(
+                con, symbol_list, max_date, categories, timesteps, predict_gap,
+                chunk_rows=streaming_config['CHUNK_ROWS'], shuffle_batches=streaming_config['SHUFFLE_BATCHES'],
+                input_layout=input_layout, symbol_scalers=symbol_scalers
+            )
+
+        get_dataset = get_window_stream
+        if not window_store_config['ENABLED']:
+            # The stream reads from this process' connection, so the grid is trained in process
+            max_workers = 1
+    else:
+        scaled_series, symbol_scalers, min_date = load_training_data(con, symbol_list, max_date, categories, logger)
+
+        dataset_cache = DatasetCache(
+            max_bytes=app_config.RNN['DATASET_CACHE']['MAX_BYTES'],
+            cache_dir=app_config.RNN['DATASET_CACHE']['CACHE_DIR']
+        )
 
+        def get_dataset(timesteps, predict_gap):
+            # Build the windows once per (timesteps, predict_gap) and reuse them for the other grid entries
+            cache_key = DatasetCache.make_key(symbol_list, data_max_date, timesteps, predict_gap, input_layout)
+            return dataset_cache.get_or_build(
+                cache_key, lambda: build_training_set(scaled_series, timesteps, predict_gap, input_layout))
+
+    if window_store_config['ENABLED']:
+        # Write the windows of every (timesteps, predict_gap) to memory mapped files once and train from disk
+        def get_dataset(timesteps, predict_gap):
+            window_store = WindowStore(
+                window_store_config['DIR'],
+                DatasetCache.make_key(symbol_list, data_max_date, timesteps, predict_gap, input_layout))
+            if window_store.exists():
+                logger.info('Reading windows for timesteps: {}, predict_gap: {} from {}'.format(
+                    timesteps, predict_gap, window_store.path_prefix))
+            elif streaming_config['ENABLED']:
+                window_stream = get_window_stream(timesteps, predict_gap)
+                window_store.write(
+                    window_stream.iter_batches(window_store_config['WRITE_BATCH_SIZE']),
+                    window_stream.count_windows(), window_stream.input_shapes)
+            else:
+                write_training_set(window_store, scaled_series, timesteps, predict_gap, input_layout)
+            return window_store
+
+    def register_model(params):
+        timesteps, predict_gap, epochs, dropout, layers, batch_size = params
         ins = sa.insert(Models).values(
-            symbols_used=symbols_used, timesteps=timesteps, predict_gap=predict_gap, epochs=epochs, dropout=dropout, layers=layers, batch_size=batch_size, min_train_date=min_date, max_train_date=max_date
+            symbols_used=symbols_used, timesteps=timesteps, predict_gap=predict_gap, epochs=epochs, dropout=dropout, layers=layers, batch_size=batch_size, min_train_date=min_date, max_train_date=max_date,
+            input_layout=input_layout
         )
 
-        con.execute(ins)
+        return con.execute(ins).inserted_primary_key[0]
 
-        latest_model_id = con.execute(
-            sa.select(sa.func.max(Models.model_id))
-                .limit(1)
-        ).fetchall()
+    train_grid(
+        param_list, get_dataset, register_model, model_dir='../lstm_models',
+        max_workers=max_workers,
+        intra_op_threads=app_config.RNN['GRID']['INTRA_OP_THREADS'],
+        inter_op_threads=app_config.RNN['GRID']['INTER_OP_THREADS'],
+        symbol_scalers=symbol_scalers,
+        export_config=app_config.RNN['EXPORT']
+    )
 
-        if latest_model_id:
-            model_id = latest_model_id[0][0]
+    if not streaming_config['ENABLED']:
+        dataset_cache.prune(app_config.RNN['DATASET_CACHE']['KEEP_LAST'])
+    if window_store_config['ENABLED']:
+        prune_window_stores(window_store_config['DIR'], window_store_config['KEEP_LAST'])
 
-        # Saving model
-        dir = '../lstm_models/model_{}'.format(str(model_id))
-        model.save(dir)
-        logger.info('Saved model {} to location {}'.format(str(model_id), dir))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from python.common.common import prune_file_groups
+from python.rnn.windowing import DATASET_ARRAYS, REPEATED_LAYOUT
+
+
+class DatasetCache:
+    '''
+    LRU cache of built (*inputs, y) training sets keyed on (symbol set, max_date, timesteps, predict_gap, input
+    layout).
+
+    Entries are kept in memory up to max_bytes, least recently used entries are evicted first. When cache_dir is
+    set, built datasets are also written to .npy files and read back as memory maps, so a re-run of the same grid
+    does not rebuild anything. max_date should be the last date of the training data rather than the current time,
+    so the key is the same across runs, and prune removes the files of entries that were not used recently.
+    '''
+
+    def __init__(self, max_bytes, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._logger = logging.getLogger(__name__)
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(symbols, max_date, timesteps, predict_gap, input_layout=REPEATED_LAYOUT):
+        return tuple(sorted(symbols)), str(max_date), int(timesteps), int(predict_gap), input_layout
+
+    def get_or_build(self, key, build_fn):
+        if key in self._entries:
+            self._logger.info('Dataset cache hit for timesteps: {}, predict_gap: {}'.format(key[2], key[3]))
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        dataset = self._load(key)
+        if dataset is None:
+            self._logger.info('Building dataset for timesteps: {}, predict_gap: {}'.format(key[2], key[3]))
+            dataset = build_fn()
+            if self.cache_dir:
+                self._save(key, dataset)
+                dataset = self._load(key)
+        else:
+            self._logger.info('Loaded dataset for timesteps: {}, predict_gap: {} from disk'.format(key[2], key[3]))
+
+        self._put(key, dataset)
+        return dataset
+
+    def _put(self, key, dataset):
+        nbytes = sum(array.nbytes for array in dataset)
+        if nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = dataset
+        self._size += nbytes
+
+        # Evict least recently used datasets until the cache is within its size cap
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= sum(array.nbytes for array in evicted)
+
+    def _file_prefix(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'dataset_{}'.format(digest))
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+
+        paths = self._paths(key)
+        # y is written last, so its presence means the dataset was saved completely
+        if not all(os.path.exists(path) for path in paths):
+            return None
+
+        # Mark the entry as used for prune
+        for path in paths:
+            os.utime(path)
+        return tuple(np.load(path, mmap_mode='r') for path in paths)
+
+    def prune(self, keep_last):
+        # Keep the files of the keep_last most recently used datasets on disk
+        if not self.cache_dir:
+            return
+        pruned = prune_file_groups(self.cache_dir, 'dataset', keep_last)
+        if pruned:
+            self._logger.info('Removed {} stale datasets from {}'.format(pruned, self.cache_dir))
+
+    def _paths(self, key):
+        prefix = self._file_prefix(key)
+        return [prefix + '_{}.npy'.format(name) for name in DATASET_ARRAYS[key[-1]]]
+
+    def _save(self, key, dataset):
+        prefix = self._file_prefix(key)
+        for name, array in zip(DATASET_ARRAYS[key[-1]], dataset):
+            suffix = '_' + name
+            # Write to a temporary file first so an interrupted run never leaves a partial dataset behind
+            tmp_path = prefix + suffix + '.tmp.npy'
+            np.save(tmp_path, array)
+            os.replace(tmp_path, prefix + suffix + '.npy')
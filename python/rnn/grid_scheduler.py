@@ -0,0 +1,209 @@
+import logging
+import os
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from python.rnn.scaling import SCALERS_FILE, save_symbol_scalers
+
+
+class SharedDataset:
+    '''
+    Copies a tuple of numpy arrays into named shared memory blocks, so worker processes can attach to the same
+    training set without re-querying MySQL or pickling the arrays. Needs python 3.8+ for multiprocessing.shared_memory.
+    '''
+
+    def __init__(self, arrays):
+        from multiprocessing import shared_memory
+
+        self._blocks = []
+        self.specs = []
+        try:
+            for array in arrays:
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                self.specs.append((block.name, array.shape, array.dtype.str))
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def configure_tensorflow_threads(intra_op_threads, inter_op_threads):
+    # Has to run before tensorflow executes its first op, 0 leaves tensorflow's default
+    import tensorflow as tf
+
+    if intra_op_threads:
+        os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def _init_worker(intra_op_threads, inter_op_threads):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+    configure_tensorflow_threads(intra_op_threads, inter_op_threads)
+
+
+def _sample_inputs(dataset, n_samples):
+    # First n_samples windows of the model inputs of a training set or window stream
+    if isinstance(dataset, tuple):
+        return [X[:n_samples] for X in dataset[:-1]]
+    inputs, _ = next(iter(dataset.iter_batches(n_samples)))
+    return inputs
+
+
+def _fit_and_save(dataset, params, model_dir, export_config=None):
+    from python.rnn.model_builder import fit_lstm_model, fit_lstm_model_on_stream, save_trained_model
+
+    logging.getLogger(__name__).info(
+        'Training model on timesteps: %s, predict_gap: %s, epochs: %s, dropout: %s, layers: %s, batch_size: %s' % params)
+    timesteps, predict_gap, epochs, dropout, layers, batch_size = params
+    if isinstance(dataset, tuple):
+        *inputs, y_train = dataset
+        model = fit_lstm_model(inputs, y_train, epochs, dropout, layers, batch_size)
+    else:
+        model = fit_lstm_model_on_stream(dataset, epochs, dropout, layers, batch_size)
+
+    # Save under a temporary name, the model is renamed to model_{id} once it is registered
+    tmp_dir = tempfile.mkdtemp(prefix='tmp_model_', dir=model_dir)
+    save_trained_model(model, tmp_dir)
+
+    if export_config and export_config['FORMAT'] == 'tflite':
+        from python.rnn.tflite_export import export_model
+
+        export_model(model, tmp_dir, _sample_inputs(dataset, export_config['PARITY_SAMPLES']), export_config)
+    return tmp_dir
+
+
+def _train_grid_entry(specs, params, model_dir, export_config):
+    if not isinstance(specs, list):
+        # A window store, opened from its files in the worker
+        return _fit_and_save(specs, params, model_dir, export_config)
+
+    from multiprocessing import shared_memory
+
+    # Attach to the training set created by the parent process
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf) for block, (_, shape, dtype) in zip(blocks, specs)]
+    try:
+        return _fit_and_save(tuple(arrays), params, model_dir, export_config)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def _share(dataset):
+    # (X, y) training sets are copied to shared memory, window stores only hold file paths and are pickled as they are
+    return SharedDataset(dataset) if isinstance(dataset, tuple) else dataset
+
+
+def _specs(shared_dataset):
+    return shared_dataset.specs if isinstance(shared_dataset, SharedDataset) else shared_dataset
+
+
+def _release(shared_dataset):
+    if isinstance(shared_dataset, SharedDataset):
+        shared_dataset.close()
+
+
+def train_grid(param_list, get_dataset, register_model, model_dir, max_workers=1, intra_op_threads=0,
+               inter_op_threads=0, symbol_scalers=None, export_config=None):
+    '''
+    Trains every (timesteps, predict_gap, epochs, dropout, layers, batch_size) entry of param_list, on a pool of
+    max_workers processes each limited to intra_op_threads/inter_op_threads tensorflow threads, or in process when
+    max_workers is 1.
+
+    get_dataset(timesteps, predict_gap) returns the (*inputs, y) training set of an entry, or a window stream with
+    input_shapes and a batches(batch_size) method that model.fit can iterate (streams are only trained in process,
+    window stores on disk can be trained in parallel). In parallel mode it is called once per window config in the
+    parent when its first entry is submitted, and in memory training sets are handed to the workers through shared
+    memory, with the datasets of at most max_workers window configs held at once. register_model(params) inserts the
+    entry into dim_models and returns its model id. Registration and the move to model_dir/model_{id} happen in the
+    parent in grid order, so model ids follow param_list regardless of which worker finishes first.
+    symbol_scalers, the (close, volume) scaling of every training symbol, is saved in every model directory, and
+    models are also exported to the lightweight inference format of export_config when it is set.
+    '''
+    logger = logging.getLogger(__name__)
+    param_list = [tuple(params) for params in param_list]
+
+    def save_model(params, tmp_dir):
+        # Register the model and move it to its final location, the temporary directory is removed when either fails
+        try:
+            if symbol_scalers is not None:
+                save_symbol_scalers(os.path.join(tmp_dir, SCALERS_FILE), symbol_scalers)
+            model_id = register_model(params)
+            model_path = os.path.join(model_dir, 'model_{}'.format(model_id))
+            os.replace(tmp_dir, model_path)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info('Saved model {} to location {}'.format(str(model_id), model_path))
+
+    if max_workers <= 1:
+        configure_tensorflow_threads(intra_op_threads, inter_op_threads)
+        for params in param_list:
+            save_model(params, _fit_and_save(get_dataset(*params[:2]), params, model_dir, export_config))
+        return
+
+    # Number of grid entries still to use each window config, so its shared dataset is released after the last one
+    remaining = Counter(params[:2] for params in param_list)
+    shared_datasets = {}
+    executor = None
+    futures = []
+    n_saved = 0
+
+    def save_next():
+        # Save the oldest submitted entry, grid entries are saved in the order they were submitted
+        nonlocal n_saved
+        params = param_list[n_saved]
+        save_model(params, futures[n_saved].result())
+        n_saved += 1
+
+        remaining[params[:2]] -= 1
+        if not remaining[params[:2]]:
+            _release(shared_datasets.pop(params[:2]))
+
+    try:
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn'),
+                                       initializer=_init_worker, initargs=(intra_op_threads, inter_op_threads))
+        for params in param_list:
+            window_key = params[:2]
+            if window_key not in shared_datasets:
+                # Datasets are built and shared when their first entry is submitted, at most max_workers window
+                # configs are resident. A grid that interleaves window configs can go over while entries of every
+                # resident config are still to be submitted
+                while len(shared_datasets) >= max_workers and n_saved < len(futures):
+                    save_next()
+                shared_datasets[window_key] = _share(get_dataset(*window_key))
+
+            futures.append(executor.submit(
+                _train_grid_entry, _specs(shared_datasets[window_key]), params, model_dir, export_config))
+
+        while n_saved < len(futures):
+            save_next()
+    finally:
+        # On failure, entries that have not started are cancelled and the running ones are waited for
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown()
+
+        # Models trained after the failing entry are never registered, remove their temporary directories
+        for future in futures[n_saved:]:
+            if not future.cancelled() and future.exception() is None:
+                shutil.rmtree(future.result(), ignore_errors=True)
+
+        for shared_dataset in shared_datasets.values():
+            _release(shared_dataset)
@@ -0,0 +1,31 @@
+import logging
+import time
+
+import numpy as np
+
+from python.rnn.windowing import model_feed
+
+
+def predict_in_batches(model, inputs_list, batch_size):
+    '''
+    Stacks the model inputs of every symbol in inputs_list, a list of input arrays per symbol, into a single array per
+    input, runs one predict over them in batches of batch_size and splits the predictions back into one array per
+    symbol using the window offsets.
+    '''
+    logger = logging.getLogger(__name__)
+
+    offsets = np.cumsum([len(inputs[0]) for inputs in inputs_list])[:-1]
+    inputs_all = [np.concatenate(arrays) for arrays in zip(*inputs_list)]
+    X_all = inputs_all[0]
+
+    start_time = time.perf_counter()
+    if len(X_all):
+        predictions = model.predict(model_feed(inputs_all), batch_size=batch_size)
+    else:
+        predictions = np.empty((0, 1))
+    elapsed = time.perf_counter() - start_time
+
+    logger.info('Predicted {} windows in {:.2f}s ({:.0f} windows/s).'.format(
+        len(X_all), elapsed, len(X_all) / max(elapsed, 1e-9)))
+
+    return np.split(predictions, offsets)
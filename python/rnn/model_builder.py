@@ -0,0 +1,119 @@
+import os
+
+import keras
+from keras.models import Sequential, Model, load_model
+from keras.layers import Dense
+from keras.layers import LSTM
+from keras.layers import Dropout
+from keras.layers import Input, Concatenate
+
+from python.rnn.windowing import model_feed
+
+# Keras 3 only saves to a single .keras file, Keras 2 (tensorflow <= 2.11 on python 3.7) saves a SavedModel directory
+KERAS_3 = int(keras.__version__.split('.')[0]) >= 3
+MODEL_FILE = 'model.keras'
+
+
+def build_lstm_model(input_shape, dropout, layers):
+    model = Sequential()
+
+    # 1st layer
+    model.add(LSTM(units=50, return_sequences=True, input_shape=input_shape))
+    model.add(Dropout(dropout))
+
+    if layers == 4:
+        # 2nd layer
+        model.add(LSTM(units=50, return_sequences=True))
+        model.add(Dropout(dropout))
+
+        # 3rd layer
+        model.add(LSTM(units=50, return_sequences=True))
+        model.add(Dropout(dropout))
+
+    # 4th layer
+    model.add(LSTM(units=50))
+    model.add(Dropout(dropout))
+
+    # Adding the output layer
+    model.add(Dense(units=1))
+
+    # Compiling the RNN
+    model.compile(optimizer='adam', loss='mean_squared_error')
+
+    return model
+
+
+def build_split_lstm_model(sequence_shape, n_static, dropout, layers):
+    '''
+    Same LSTM stack as build_lstm_model over the close and volume windows only, the static features of the window
+    go through a dense branch that is joined with the LSTM output before the output layer.
+    '''
+    sequence_input = Input(shape=sequence_shape)
+    static_input = Input(shape=(n_static,))
+
+    # 1st layer
+    sequence = LSTM(units=50, return_sequences=True)(sequence_input)
+    sequence = Dropout(dropout)(sequence)
+
+    if layers == 4:
+        # 2nd layer
+        sequence = LSTM(units=50, return_sequences=True)(sequence)
+        sequence = Dropout(dropout)(sequence)
+
+        # 3rd layer
+        sequence = LSTM(units=50, return_sequences=True)(sequence)
+        sequence = Dropout(dropout)(sequence)
+
+    # 4th layer
+    sequence = LSTM(units=50)(sequence)
+    sequence = Dropout(dropout)(sequence)
+
+    # Static features branch, a dense layer over the one hot columns
+    static = Dense(units=16, activation='relu')(static_input)
+
+    # Adding the output layer on the joined branches
+    output = Dense(units=1)(Concatenate()([sequence, static]))
+
+    model = Model(inputs=[sequence_input, static_input], outputs=output)
+
+    # Compiling the RNN
+    model.compile(optimizer='adam', loss='mean_squared_error')
+
+    return model
+
+
+def build_model(input_shapes, dropout, layers):
+    # One input is the repeated layout, two inputs are the split layout, see windowing.model_input_shapes
+    if len(input_shapes) == 1:
+        return build_lstm_model(tuple(input_shapes[0]), dropout, layers)
+    sequence_shape, static_shape = input_shapes
+    return build_split_lstm_model(tuple(sequence_shape), static_shape[0], dropout, layers)
+
+
+def fit_lstm_model(inputs, y_train, epochs, dropout, layers, batch_size):
+    model = build_model([X.shape[1:] for X in inputs], dropout, layers)
+
+    # Fitting the RNN to the Training set
+    model.fit(model_feed(inputs), y_train, epochs=epochs, batch_size=batch_size)
+
+    return model
+
+
+def fit_lstm_model_on_stream(window_stream, epochs, dropout, layers, batch_size):
+    model = build_model(window_stream.input_shapes, dropout, layers)
+
+    # Fitting the RNN on the batches of the stream, which are batch_size windows each
+    model.fit(window_stream.batches(batch_size), epochs=epochs)
+
+    return model
+
+
+def save_trained_model(model, model_dir):
+    # Saves model in model_dir, as a .keras file inside it on Keras 3 and as the SavedModel directory itself on Keras 2
+    model.save(os.path.join(model_dir, MODEL_FILE) if KERAS_3 else model_dir)
+
+
+def load_trained_model(model_dir):
+    # Loads a model saved by save_trained_model, or a SavedModel directory of a model saved by Keras 2
+    model_path = os.path.join(model_dir, MODEL_FILE)
+    return load_model(model_path if os.path.exists(model_path) else model_dir)
@@ -0,0 +1,119 @@
+import logging
+import os
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import sqlalchemy as sa
+
+from python.rnn.scaling import SCALERS_FILE, load_symbol_scalers
+from python.rnn.tflite_export import TFLITE_FILE, TFLiteModel
+from python.rnn.windowing import model_feed
+from schema.data_model import Models
+
+ModelSpec = namedtuple('ModelSpec', ['model_id', 'timesteps', 'predict_gap', 'input_layout'])
+
+# A loaded model, its input signature (input shapes without the samples dimension) and its saved symbol scalers
+LoadedModel = namedtuple('LoadedModel', ['model', 'signature', 'symbol_scalers', 'nbytes'])
+
+
+class ModelRegistry:
+    '''
+    Models of dim_models loaded lazily from model_dir/model_{id} on first use and kept in an LRU cache, so a long
+    running process serves many models without reloading them. Loaded models are kept up to max_bytes of weights,
+    least recently used models are evicted first.
+
+    The input signature of every loaded model is recorded, check_signature fails fast when the inputs built for a
+    model do not match it. With the 'tflite' backend, models exported to TFLite by the trainer are served from their
+    artifact with num_threads interpreter threads, other models are loaded with Keras.
+    '''
+
+    def __init__(self, con, model_dir, max_bytes, backend='keras', num_threads=None):
+        self.con = con
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.num_threads = num_threads
+        self._specs = {}
+        self._entries = OrderedDict()
+        self._size = 0
+        self._logger = logging.getLogger(__name__)
+
+    def refresh(self):
+        # Reads the config of every model of dim_models, so newly trained models become visible
+        rows = self.con.execute(
+            sa.select(Models.model_id, Models.timesteps, Models.predict_gap, Models.input_layout)
+        ).fetchall()
+        self._specs = {row[0]: ModelSpec(*row) for row in rows}
+
+    def model_ids(self):
+        if not self._specs:
+            self.refresh()
+        return sorted(self._specs)
+
+    def spec(self, model_id):
+        if model_id not in self._specs:
+            self.refresh()
+        if model_id not in self._specs:
+            raise ValueError('Model {} is not registered in {}'.format(model_id, Models.__tablename__))
+        return self._specs[model_id]
+
+    def model_path(self, model_id):
+        return os.path.join(self.model_dir, 'model_{}'.format(model_id))
+
+    def get(self, model_id):
+        # Loaded model of model_id, loading it on a cache miss
+        if model_id in self._entries:
+            self._entries.move_to_end(model_id)
+            return self._entries[model_id]
+
+        spec = self.spec(model_id)
+        model_path = self.model_path(model_id)
+        tflite_path = os.path.join(model_path, TFLITE_FILE)
+        if self.backend == 'tflite' and os.path.exists(tflite_path):
+            self._logger.info('Loading model {} from {}'.format(model_id, tflite_path))
+            model = TFLiteModel(tflite_path, num_threads=self.num_threads)
+            signature, nbytes = model.input_shapes, model.nbytes
+        else:
+            # Keras is only imported when a model is served with it, the TFLite backend does not need it
+            from python.rnn.model_builder import load_trained_model
+
+            self._logger.info('Loading model {} from {}'.format(model_id, model_path))
+            model = load_trained_model(model_path)
+            # float32 weights
+            signature, nbytes = [tuple(model_input.shape[1:]) for model_input in model.inputs], model.count_params() * 4
+
+        if signature[0][0] != spec.timesteps:
+            raise ValueError('Model {} takes windows of {} timesteps but is registered with {} timesteps'.format(
+                model_id, signature[0][0], spec.timesteps))
+
+        scalers_path = os.path.join(model_path, SCALERS_FILE)
+        symbol_scalers = load_symbol_scalers(scalers_path) if os.path.exists(scalers_path) else {}
+
+        entry = LoadedModel(model, signature, symbol_scalers, nbytes)
+        self._put(model_id, entry)
+        return entry
+
+    def check_signature(self, model_id, input_shapes):
+        # Raises when inputs of input_shapes, without the samples dimension, cannot be fed to the model
+        signature = self.get(model_id).signature
+        if [tuple(shape) for shape in input_shapes] != signature:
+            raise ValueError('Inputs of shapes {} do not match the input signature {} of model {}'.format(
+                [tuple(shape) for shape in input_shapes], signature, model_id))
+
+    def warm_up(self, model_ids):
+        # Loads the models and runs one prediction on each, so the first real batch does not pay for graph tracing
+        for model_id in model_ids:
+            entry = self.get(model_id)
+            entry.model.predict(
+                model_feed([np.zeros((1,) + shape, dtype=np.float32) for shape in entry.signature]), verbose=0)
+            self._logger.info('Warmed up model {}'.format(model_id))
+
+    def _put(self, model_id, entry):
+        self._entries[model_id] = entry
+        self._size += entry.nbytes
+
+        # Evict least recently used models until the cache is within its size cap, keeping the model just loaded
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            evicted_id, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+            self._logger.info('Evicted model {} from the model cache'.format(evicted_id))
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+SymbolSeries = namedtuple('SymbolSeries', ['stock_datetime', 'close', 'volume', 'non_numeric_features'])
+
+
+def encode_non_numeric_features(sql_df, categories=None):
+    '''
+    One hot encoding of sector and market_type, dummies are kept as uint8 so they can be selected as the non numeric
+    features. categories optionally maps each column to its full list of categories, so the dummy columns stay the
+    same whichever subset of symbols is in sql_df.
+    '''
+    dummies = []
+    for column in ('sector', 'market_type'):
+        values = sql_df[column]
+        if categories:
+            values = pd.Categorical(values, categories=categories[column])
+        dummies.append(pd.get_dummies(values, prefix=column + '_', drop_first=True, dtype=np.uint8)
+                       .set_axis(sql_df.index))
+    # Concatenate all the dummies at once rather than copying the frame on every join
+    return pd.concat([sql_df.drop(columns=['sector', 'market_type'])] + dummies, axis=1)
+
+
+def count_dummy_columns(categories):
+    # Number of dummy columns encode_non_numeric_features creates for categories, every category but the first
+    return sum(max(len(values) - 1, 0) for values in categories.values())
+
+
+class SymbolPartition:
+    '''
+    Sorts the combined stock dataframe by symbol and date once, and hands out contiguous per symbol slices of the
+    underlying numpy arrays instead of filtering the whole dataframe with a boolean mask for every symbol.
+    '''
+
+    def __init__(self, sql_df):
+        sorted_df = sql_df.sort_values(['symbol', 'stock_datetime'], kind='mergesort')
+
+        self.stock_datetime = sorted_df['stock_datetime'].to_numpy(dtype=object)
+        self.close = sorted_df['close'].to_numpy()
+        self.volume = sorted_df['volume'].to_numpy()
+        self.non_numeric_features = sorted_df.select_dtypes(include=['uint8']).to_numpy()
+
+        # Offsets of each symbol into the sorted arrays
+        symbols, starts, counts = np.unique(sorted_df['symbol'].to_numpy(), return_index=True, return_counts=True)
+        self.symbols = list(symbols)
+        self._slices = {symbol: slice(start, start + count) for symbol, start, count in zip(symbols, starts, counts)}
+
+    def __contains__(self, symbol):
+        return symbol in self._slices
+
+    def __iter__(self):
+        for symbol in self.symbols:
+            yield symbol, self.get(symbol)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def get(self, symbol):
+        # Unknown symbols return empty slices, same as an empty boolean mask would
+        s = self._slices.get(symbol, slice(0, 0))
+        return SymbolSeries(
+            stock_datetime=self.stock_datetime[s],
+            close=self.close[s],
+            volume=self.volume[s],
+            non_numeric_features=self.non_numeric_features[s]
+        )
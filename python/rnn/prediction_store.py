@@ -0,0 +1,110 @@
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import insert
+
+from python.common.common import chunks
+from schema.data_model import StockPrices, Symbols, StockPrediction
+
+SeriesStats = namedtuple('SeriesStats', ['min_close', 'max_close', 'min_volume', 'max_volume', 'max_datetime'])
+
+
+def read_series_stats(con, symbols, max_date=None):
+    # Min/max of the history of each symbol up to max_date, used as the scaling range without reading the whole series
+    stmt = sa.select(
+        StockPrices.symbol, sa.func.min(StockPrices.close), sa.func.max(StockPrices.close),
+        sa.func.min(StockPrices.volume), sa.func.max(StockPrices.volume), sa.func.max(StockPrices.stock_datetime)) \
+        .where(StockPrices.symbol.in_(symbols))
+    if max_date is not None:
+        stmt = stmt.where(StockPrices.stock_datetime <= max_date)
+    rows = con.execute(stmt.group_by(StockPrices.symbol)).fetchall()
+    return {row[0]: SeriesStats(*row[1:]) for row in rows}
+
+
+def read_symbol_categories(con, symbols):
+    # Categories of the shortlist, so the one hot columns do not depend on which symbols are loaded
+    rows = con.execute(
+        sa.select(Symbols.sector, Symbols.market_type).where(Symbols.symbol.in_(symbols))
+    ).fetchall()
+    return {
+        'sector': sorted({row[0] for row in rows if row[0] is not None}),
+        'market_type': sorted({row[1] for row in rows if row[1] is not None})
+    }
+
+
+def read_prediction_watermarks(con, model_id, symbols):
+    # Latest stock_datetime already predicted for each symbol by the model
+    rows = con.execute(
+        sa.select(StockPrediction.symbol, sa.func.max(StockPrediction.stock_datetime))
+        .where(StockPrediction.model_id == model_id)
+        .where(StockPrediction.symbol.in_(symbols))
+        .group_by(StockPrediction.symbol)
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def read_last_predictable_dates(con, symbols):
+    # Second to last price date of each symbol, the latest stock_datetime the predictor writes a prediction for
+    latest_prices = StockPrices.__table__.alias('latest_prices')
+    latest_datetime = sa.select(sa.func.max(latest_prices.c.stock_datetime)) \
+        .where(latest_prices.c.symbol == StockPrices.symbol) \
+        .scalar_subquery()
+    rows = con.execute(
+        sa.select(StockPrices.symbol, sa.func.max(StockPrices.stock_datetime))
+        .where(StockPrices.symbol.in_(symbols))
+        .where(StockPrices.stock_datetime < latest_datetime)
+        .group_by(StockPrices.symbol)
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def read_window_start_dates(con, watermarks, lookback):
+    # Date of the lookback-th latest price on or before each watermark, windows for the new dates start from there
+    start_dates = {}
+    for symbol, watermark in watermarks.items():
+        row = con.execute(
+            sa.select(StockPrices.stock_datetime)
+            .where(StockPrices.symbol == symbol)
+            .where(StockPrices.stock_datetime <= watermark)
+            .order_by(StockPrices.stock_datetime.desc())
+            .limit(1)
+            .offset(lookback - 1)
+        ).fetchone()
+        if row:
+            start_dates[symbol] = row[0]
+    return start_dates
+
+
+def read_prediction_dataset(con, symbols, start_dates=None):
+    # Full history of each symbol, or only the rows from its start date when one is given
+    start_dates = start_dates or {}
+    symbol_filters = [StockPrices.symbol.in_([symbol for symbol in symbols if symbol not in start_dates])] + [
+        sa.and_(StockPrices.symbol == symbol, StockPrices.stock_datetime >= start_dates[symbol])
+        for symbol in symbols if symbol in start_dates
+    ]
+    return pd.read_sql(
+        sa.select(
+            StockPrices.stock_datetime, StockPrices.symbol, StockPrices.close, StockPrices.volume,
+            Symbols.market_type,
+            Symbols.sector) \
+            .join(Symbols) \
+            .where(sa.or_(*symbol_filters)), con)
+
+
+def upsert_predictions(con, records, batch_size):
+    # Predictions are keyed on (model_id, symbol, stock_datetime), re-predicted dates overwrite the previous value
+    created_date = datetime.utcnow()
+    for record in records:
+        record['created_date'] = created_date
+
+    ins = insert(StockPrediction)
+    on_duplicate_ins = ins.on_duplicate_key_update(
+        prediction_datetime=ins.inserted.prediction_datetime, predicted_close=ins.inserted.predicted_close,
+        created_date=ins.inserted.created_date
+    )
+    for batch in chunks(records, batch_size):
+        with con.begin():
+            con.execute(on_duplicate_ins, batch)
+    return len(records)
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Scaling of the training symbols, saved next to every model in lstm_models/model_{id}
+SCALERS_FILE = 'scalers.npz'
+
+
+class MinMaxScaling(namedtuple('MinMaxScaling', ['min_', 'scale_'])):
+    '''
+    Vectorised equivalent of sklearn's MinMaxScaler(feature_range=(0, 1)), built from the data min and max so the
+    parameters can come from a SQL aggregate instead of a scan of the full series. min_ and scale_ may be arrays,
+    in which case the transforms broadcast across them.
+    '''
+
+    @classmethod
+    def from_range(cls, data_min, data_max):
+        data_range = np.asarray(data_max, dtype=np.float64) - np.asarray(data_min, dtype=np.float64)
+        # Constant series are scaled by 1, same as sklearn
+        data_range = np.where(data_range < 10 * np.finfo(np.float64).eps, 1.0, data_range)
+        scale = 1.0 / data_range
+        return cls(min_=0 - np.asarray(data_min, dtype=np.float64) * scale, scale_=scale)
+
+    @classmethod
+    def fit(cls, values):
+        return cls.from_range(np.nanmin(values, axis=0), np.nanmax(values, axis=0))
+
+    def transform(self, values):
+        return values * self.scale_ + self.min_
+
+    def inverse_transform(self, values):
+        return (values - self.min_) / self.scale_
+
+
+def save_symbol_scalers(path, symbol_scalers):
+    '''
+    Saves the (close, volume) MinMaxScaling of every symbol of symbol_scalers to a npz file, as one array per
+    parameter aligned with an array of the symbols.
+    '''
+    symbols = sorted(symbol_scalers)
+    close = [symbol_scalers[symbol][0] for symbol in symbols]
+    volume = [symbol_scalers[symbol][1] for symbol in symbols]
+    np.savez(
+        path, symbol=np.array(symbols, dtype=str),
+        close_min=np.array([scaling.min_ for scaling in close], dtype=np.float64),
+        close_scale=np.array([scaling.scale_ for scaling in close], dtype=np.float64),
+        volume_min=np.array([scaling.min_ for scaling in volume], dtype=np.float64),
+        volume_scale=np.array([scaling.scale_ for scaling in volume], dtype=np.float64))
+
+
+def load_symbol_scalers(path):
+    # Inverse of save_symbol_scalers, maps each symbol to its (close, volume) MinMaxScaling
+    with np.load(path) as scalers:
+        return {
+            symbol: (MinMaxScaling(close_min, close_scale), MinMaxScaling(volume_min, volume_scale))
+            for symbol, close_min, close_scale, volume_min, volume_scale in zip(
+                scalers['symbol'].tolist(), scalers['close_min'], scalers['close_scale'], scalers['volume_min'],
+                scalers['volume_scale'])
+        }
+
+
+def symbol_scalers_from_stats(series_stats):
+    # (close, volume) MinMaxScaling of every symbol of read_series_stats
+    return {
+        symbol: (MinMaxScaling.from_range(stats.min_close, stats.max_close),
+                 MinMaxScaling.from_range(stats.min_volume, stats.max_volume))
+        for symbol, stats in series_stats.items()
+    }
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from python.rnn.partition import count_dummy_columns, encode_non_numeric_features
+from python.rnn.scaling import MinMaxScaling
+from python.rnn.windowing import REPEATED_LAYOUT, build_windows, build_targets, join_model_inputs, \
+    model_feed, model_input_shapes
+from schema.data_model import StockPrices, Symbols
+
+# Streamed columns are downcast as soon as they are read
+FLOAT_COLUMNS = {'close': np.float32, 'volume': np.float32}
+CATEGORY_COLUMNS = {'symbol': 'category', 'market_type': 'category', 'sector': 'category'}
+
+
+def _training_filter(stmt, symbols, max_date):
+    return stmt.where(StockPrices.symbol.in_(symbols)).where(StockPrices.stock_datetime <= max_date)
+
+
+def read_training_min_date(con, symbols, max_date):
+    # First date of the training data, without reading it
+    return con.execute(
+        _training_filter(sa.select(sa.func.min(StockPrices.stock_datetime)), symbols, max_date)
+    ).scalar()
+
+
+def read_training_max_date(con, symbols, max_date):
+    # Last date of the training data, the same for every run until prices after it are loaded
+    return con.execute(
+        _training_filter(sa.select(sa.func.max(StockPrices.stock_datetime)), symbols, max_date)
+    ).scalar()
+
+
+def iter_symbol_frames(con, symbols, max_date, chunk_rows):
+    '''
+    Streams the training rows of symbols, ordered by symbol and date, through a server side cursor chunk_rows rows
+    at a time and yields one downcast dataframe per symbol. Besides the current chunk, only the rows of the symbol
+    being assembled are held in memory.
+    '''
+    stmt = _training_filter(
+        sa.select(
+            StockPrices.stock_datetime, StockPrices.symbol, StockPrices.close, StockPrices.volume, Symbols.market_type,
+            Symbols.sector)
+        .join(Symbols), symbols, max_date) \
+        .order_by(StockPrices.symbol, StockPrices.stock_datetime)
+
+    def assemble(pieces):
+        return pd.concat(pieces, ignore_index=True).astype(CATEGORY_COLUMNS)
+
+    pending = []
+    for chunk in pd.read_sql(stmt, con.execution_options(stream_results=True), chunksize=chunk_rows):
+        chunk = chunk.astype(FLOAT_COLUMNS)
+
+        # Split the chunk where the symbol changes, a symbol is complete once the next one starts
+        chunk_symbols = chunk['symbol'].to_numpy()
+        boundaries = np.flatnonzero(chunk_symbols[1:] != chunk_symbols[:-1]) + 1
+        for start, end in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(chunk)]])):
+            if pending and pending[0]['symbol'].iat[0] != chunk_symbols[start]:
+                yield assemble(pending)
+                pending = []
+            pending.append(chunk.iloc[start:end])
+
+    if pending:
+        yield assemble(pending)
+
+
+class SqlWindowStream:
+    '''
+    Training windows of a (timesteps, predict_gap) config streamed from fact_stock_prices symbol by symbol, so only
+    one symbol's history and one batch of windows are in memory at a time instead of the whole training set.
+
+    Each symbol is min max scaled over its own history, same as scale_partition, or with its (close, volume) scaling
+    in symbol_scalers when given, and the one hot columns use the fixed categories of the shortlist so every symbol has
+    the same features. The stream is read again on every epoch. Batches hold the model inputs of input_layout, see
+    windowing.build_model_inputs.
+    '''
+
+    def __init__(self, con, symbols, max_date, categories, timesteps, predict_gap, chunk_rows=100000,
+                 shuffle_batches=0, input_layout=REPEATED_LAYOUT, symbol_scalers=None):
+        self.con = con
+        self.symbols = symbols
+        self.max_date = max_date
+        self.categories = categories
+        self.timesteps = timesteps
+        self.predict_gap = predict_gap
+        self.chunk_rows = chunk_rows
+        self.shuffle_batches = shuffle_batches
+        self.input_layout = input_layout
+        self.symbol_scalers = symbol_scalers or {}
+
+        self.input_shapes = model_input_shapes(timesteps, count_dummy_columns(categories), input_layout)
+
+    def count_windows(self):
+        # Number of windows the stream yields, from the row count of every symbol, without reading the rows
+        rows_per_symbol = self.con.execute(
+            _training_filter(sa.select(sa.func.count()).select_from(StockPrices).join(Symbols), self.symbols,
+                             self.max_date)
+            .group_by(StockPrices.symbol)).scalars().all()
+        return sum(max(rows - self.timesteps - self.predict_gap, 0) for rows in rows_per_symbol)
+
+    def iter_batches(self, batch_size):
+        for symbol_df in iter_symbol_frames(self.con, self.symbols, self.max_date, self.chunk_rows):
+            symbol_df = encode_non_numeric_features(symbol_df, self.categories)
+
+            close = symbol_df['close'].to_numpy()
+            volume = symbol_df['volume'].to_numpy()
+            symbol = symbol_df['symbol'].iat[0]
+            if symbol in self.symbol_scalers:
+                sc_close, sc_volume = self.symbol_scalers[symbol]
+            else:
+                sc_close, sc_volume = MinMaxScaling.fit(close), MinMaxScaling.fit(volume)
+            scaled_close = sc_close.transform(close).astype(np.float32)
+            scaled_volume = sc_volume.transform(volume).astype(np.float32)
+            non_numeric_features = symbol_df.select_dtypes(include=['uint8']).to_numpy()
+
+            # Windows are views over the symbol's series, only the rows of a batch are copied
+            sequence, static = build_windows(
+                scaled_close, scaled_volume, non_numeric_features, self.timesteps, self.predict_gap, as_view=True)
+            targets = build_targets(scaled_close, self.timesteps, self.predict_gap)
+
+            for start in range(0, len(targets), batch_size):
+                end = start + batch_size
+                yield join_model_inputs(sequence[start:end], static[start:end], self.input_layout), targets[start:end]
+
+    def batches(self, batch_size):
+        # tf.data pipeline over iter_batches, optionally shuffling the order of shuffle_batches batches at a time
+        import tensorflow as tf
+
+        input_specs = [tf.TensorSpec(shape=(None,) + tuple(shape), dtype=tf.float32) for shape in self.input_shapes]
+        dataset = tf.data.Dataset.from_generator(
+            lambda: ((model_feed(inputs), targets) for inputs, targets in self.iter_batches(batch_size)),
+            output_signature=(model_feed(input_specs), tf.TensorSpec(shape=(None,), dtype=tf.float32)))
+        if self.shuffle_batches:
+            dataset = dataset.shuffle(self.shuffle_batches)
+        return dataset.prefetch(tf.data.AUTOTUNE)
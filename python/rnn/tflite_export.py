@@ -0,0 +1,116 @@
+import logging
+import os
+
+import numpy as np
+
+from python.rnn.windowing import model_feed
+
+# TFLite artifact written next to the Keras model in lstm_models/model_{id}
+TFLITE_FILE = 'model.tflite'
+
+QUANTIZATIONS = (None, 'float16', 'int8')
+
+
+def export_tflite(model, path, batch_size, quantization=None):
+    '''
+    Converts a trained Keras model to a TFLite flatbuffer at path. The LSTM layers only convert to TFLite builtin
+    ops with a static batch size, so the artifact takes batches of exactly batch_size windows (TFLiteModel pads the
+    last one). quantization is None, 'float16' (float16 weights) or 'int8' (dynamic range, int8 weights and float
+    activations).
+    '''
+    import tensorflow as tf
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError('Unknown quantization {}'.format(quantization))
+
+    input_specs = [
+        tf.TensorSpec((batch_size,) + tuple(model_input.shape[1:]), tf.float32) for model_input in model.inputs]
+    # A concrete function of the model at the fixed batch size converts on Keras 2 and 3 alike, multi input models
+    # take their inputs as a single list argument. Its weights are frozen into constants first, the converter leaves
+    # the weights read inside the Keras 3 LSTM loop as variables that the TFLite interpreter cannot read
+    concrete_function = tf.function(model).get_concrete_function(
+        input_specs[0] if len(input_specs) == 1 else input_specs)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([convert_variables_to_constants_v2(concrete_function)])
+    if quantization:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    flatbuffer = converter.convert()
+
+    with open(path, 'wb') as f:
+        f.write(flatbuffer)
+
+
+def _interpreter(path, num_threads):
+    # The standalone tflite_runtime package avoids importing the whole of tensorflow, when it is installed
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+
+    return Interpreter(model_path=path, num_threads=num_threads)
+
+
+class TFLiteModel:
+    '''
+    TFLite artifact of export_tflite behind the same predict interface as a Keras model, so predict_in_batches and
+    the model registry can use either.
+    '''
+
+    def __init__(self, path, num_threads=None):
+        self._interpreter = _interpreter(path, num_threads)
+        self._interpreter.allocate_tensors()
+
+        # Inputs are named after the position of the model input they feed
+        self._input_details = sorted(self._interpreter.get_input_details(), key=lambda details: details['name'])
+        self._output_index = self._interpreter.get_output_details()[0]['index']
+        self.batch_size = int(self._input_details[0]['shape'][0])
+        self.input_shapes = [tuple(int(dim) for dim in details['shape'][1:]) for details in self._input_details]
+        self.nbytes = os.path.getsize(path)
+
+    def predict(self, inputs, batch_size=None, verbose=0):
+        # batch_size is ignored, the artifact runs batches of its own static size
+        inputs = [inputs] if isinstance(inputs, np.ndarray) else list(inputs)
+        n_samples = len(inputs[0])
+
+        predictions = []
+        for start in range(0, n_samples, self.batch_size):
+            end = min(start + self.batch_size, n_samples)
+            for details, X in zip(self._input_details, inputs):
+                batch = np.zeros(details['shape'], dtype=np.float32)
+                batch[:end - start] = X[start:end]
+                self._interpreter.set_tensor(details['index'], batch)
+            self._interpreter.invoke()
+            predictions.append(self._interpreter.get_tensor(self._output_index)[:end - start].copy())
+
+        return np.concatenate(predictions) if predictions else np.empty((0, 1), dtype=np.float32)
+
+
+def check_parity(model, tflite_model, inputs):
+    # Largest absolute difference between the Keras and the TFLite predictions of inputs
+    expected = model.predict(model_feed(inputs), batch_size=tflite_model.batch_size, verbose=0)
+    return float(np.max(np.abs(expected - tflite_model.predict(model_feed(inputs)))))
+
+
+def export_model(model, model_dir, sample_inputs, export_config):
+    '''
+    Writes the TFLite artifact of model to model_dir and compares its predictions of sample_inputs with the Keras
+    model. Artifacts whose largest difference is above the configured tolerance are removed, so the model is served
+    with Keras.
+    '''
+    logger = logging.getLogger(__name__)
+    path = os.path.join(model_dir, TFLITE_FILE)
+    export_tflite(model, path, export_config['BATCH_SIZE'], export_config['QUANTIZATION'])
+
+    max_error = check_parity(model, TFLiteModel(path), sample_inputs)
+    if max_error > export_config['PARITY_TOLERANCE']:
+        os.remove(path)
+        logger.warning('TFLite export differs from the Keras model by up to {:.6f}, above the tolerance of {}, '
+                       'the artifact was removed'.format(max_error, export_config['PARITY_TOLERANCE']))
+    else:
+        logger.info('Exported {} TFLite model, largest difference to the Keras model {:.6f}'.format(
+            export_config['QUANTIZATION'] or 'float32', max_error))
@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import math
+import os
+
+import numpy as np
+from keras.utils import Sequence
+
+from python.common.common import prune_file_groups
+from python.rnn.windowing import DATASET_ARRAYS, model_feed
+
+
+class WindowSequence(Sequence):
+    '''
+    Keras Sequence over the input arrays and targets of a training set, usually memory maps. When shuffle is set the
+    samples are shuffled on every epoch, as model.fit(shuffle=True) does for in memory training sets, and each batch
+    reads its samples in file order. Otherwise batches are contiguous slices.
+    '''
+
+    def __init__(self, inputs, y, batch_size, shuffle=True, seed=None):
+        super().__init__()
+        self.inputs = inputs
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(len(y))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(len(self.y) / self.batch_size)
+
+    def __getitem__(self, index):
+        start = index * self.batch_size
+        end = start + self.batch_size
+        if self.shuffle:
+            # Sorted so the reads of a batch move forward through the memory maps
+            samples = np.sort(self._order[start:end])
+            return model_feed([np.asarray(X[samples]) for X in self.inputs]), np.asarray(self.y[samples])
+        return model_feed([np.asarray(X[start:end]) for X in self.inputs]), np.asarray(self.y[start:end])
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
+
+
+class WindowStore:
+    '''
+    Training windows of a dataset key kept on disk as float32 .npy files, written incrementally through memory maps
+    so the whole training set never has to fit in memory, and read back as memory maps for training.
+
+    Only the file paths are kept on the object, so a store can be handed to grid worker processes. As with
+    DatasetCache, the key's max_date should be the last date of the training data so runs share their stores.
+    '''
+
+    def __init__(self, store_dir, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        self.path_prefix = os.path.join(store_dir, 'windows_{}'.format(digest))
+        # One file per model input of the key's input layout, followed by the targets
+        self.paths = [self.path_prefix + '_{}.npy'.format(name) for name in DATASET_ARRAYS[key[-1]]]
+        os.makedirs(store_dir, exist_ok=True)
+
+    def exists(self):
+        # y is moved in place last, so its presence means the store was written completely
+        return all(os.path.exists(path) for path in self.paths)
+
+    def write(self, batches, n_samples, input_shapes):
+        '''
+        Writes the (inputs, y) batches of a training set of n_samples windows, whose inputs have input_shapes, to the
+        store one batch in memory at a time.
+        '''
+        logger = logging.getLogger(__name__)
+        tmp_paths = [path[:-len('.npy')] + '.tmp.npy' for path in self.paths]
+        shapes = [(n_samples,) + tuple(shape) for shape in input_shapes] + [(n_samples,)]
+        arrays = [np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+                  for tmp_path, shape in zip(tmp_paths, shapes)]
+
+        offset = 0
+        try:
+            for inputs, y in batches:
+                if offset + len(y) > n_samples:
+                    raise ValueError('More than the expected {} windows were written'.format(n_samples))
+                for array, batch in zip(arrays, list(inputs) + [y]):
+                    array[offset:offset + len(y)] = batch
+                offset += len(y)
+            if offset != n_samples:
+                raise ValueError('Expected {} windows but {} were written'.format(n_samples, offset))
+            for array in arrays:
+                array.flush()
+        except BaseException:
+            del arrays
+            for tmp_path in tmp_paths:
+                os.remove(tmp_path)
+            raise
+        del arrays
+
+        for tmp_path, path in zip(tmp_paths, self.paths):
+            os.replace(tmp_path, path)
+        logger.info('Wrote {} windows to {}'.format(n_samples, self.path_prefix))
+
+    def arrays(self):
+        # Mark the store as used for prune_window_stores
+        for path in self.paths:
+            os.utime(path)
+        return [np.load(path, mmap_mode='r') for path in self.paths]
+
+    @property
+    def input_shapes(self):
+        return [X.shape[1:] for X in self.arrays()[:-1]]
+
+    def iter_batches(self, batch_size):
+        # (inputs, y) batches in store order
+        *inputs, y = self.arrays()
+        for start in range(0, len(y), batch_size):
+            end = start + batch_size
+            yield [np.asarray(X[start:end]) for X in inputs], np.asarray(y[start:end])
+
+    def batches(self, batch_size):
+        *inputs, y = self.arrays()
+        return WindowSequence(inputs, y, batch_size)
+
+
+def prune_window_stores(store_dir, keep_last):
+    # Keep the files of the keep_last most recently used window stores
+    pruned = prune_file_groups(store_dir, 'windows', keep_last)
+    if pruned:
+        logging.getLogger(__name__).info('Removed {} stale window stores from {}'.format(pruned, store_dir))
@@ -0,0 +1,83 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Model input layouts recorded in dim_models: static features repeated on every timestep of a single input, or fed
+# once per window to a separate input branch next to the close and volume windows
+REPEATED_LAYOUT = 'repeated'
+SPLIT_LAYOUT = 'split'
+
+# Arrays of a training set of each layout, the model inputs followed by the targets
+DATASET_ARRAYS = {REPEATED_LAYOUT: ('X', 'y'), SPLIT_LAYOUT: ('X', 'static', 'y')}
+
+
+def build_windows(scaled_close, scaled_volume, static_features, timesteps, predict_gap, as_view=False):
+    '''
+    Build the (samples, timesteps, features) tensor used by the LSTM models.
+
+    Sample i (for i in range(timesteps + predict_gap, len(scaled_close))) holds the close and volume of rows
+    [i - timesteps - predict_gap, i - predict_gap) followed by the static features of row i repeated on every
+    timestep.
+
+    When as_view is True, returns a tuple of read-only strided views (sequence_features, static_features) of shape
+    (samples, timesteps, 2) and (samples, timesteps, n_static) instead of copying them into a single array.
+    '''
+    scaled_close = np.asarray(scaled_close).reshape(-1)
+    scaled_volume = np.asarray(scaled_volume).reshape(-1)
+    static_features = np.asarray(static_features)
+    n_samples = max(len(scaled_close) - timesteps - predict_gap, 0)
+
+    # Windows over (close, volume), shape (rows - timesteps + 1, 2, timesteps) -> (samples, timesteps, 2)
+    series = np.column_stack([scaled_close, scaled_volume])
+    if len(series) >= timesteps:
+        sequence = sliding_window_view(series, timesteps, axis=0)[:n_samples].transpose(0, 2, 1)
+    else:
+        sequence = np.empty((0, timesteps, 2), dtype=series.dtype)
+
+    # Static features of the target row broadcast across every timestep
+    static = static_features[timesteps + predict_gap:]
+    static = np.broadcast_to(static[:, np.newaxis, :], (n_samples, timesteps, static.shape[1]))
+
+    if as_view:
+        return sequence, static
+
+    return np.concatenate([sequence, static], axis=2, dtype=sequence.dtype)
+
+
+def build_targets(scaled_close, timesteps, predict_gap):
+    # Target of sample i is the close of row i
+    return np.asarray(scaled_close).reshape(-1)[timesteps + predict_gap:]
+
+
+def join_model_inputs(sequence, static, input_layout=REPEATED_LAYOUT):
+    '''
+    Copies the (sequence_features, static_features) views of build_windows, or a slice of them, into the list of
+    input arrays of a model of input_layout. Repeated models take the single tensor of build_windows, split models
+    take the (samples, timesteps, 2) close and volume windows and the (samples, n_static) static features of the
+    target rows.
+    '''
+    if input_layout == REPEATED_LAYOUT:
+        return [np.concatenate([sequence, static], axis=2, dtype=sequence.dtype)]
+    if input_layout == SPLIT_LAYOUT:
+        return [np.ascontiguousarray(sequence), static[:, 0, :].astype(sequence.dtype)]
+    raise ValueError('Unknown input layout {}'.format(input_layout))
+
+
+def build_model_inputs(scaled_close, scaled_volume, static_features, timesteps, predict_gap,
+                       input_layout=REPEATED_LAYOUT):
+    return join_model_inputs(
+        *build_windows(scaled_close, scaled_volume, static_features, timesteps, predict_gap, as_view=True),
+        input_layout)
+
+
+def model_input_shapes(timesteps, n_static, input_layout=REPEATED_LAYOUT):
+    # Shapes of the inputs returned by build_model_inputs, without the samples dimension
+    if input_layout == REPEATED_LAYOUT:
+        return [(timesteps, 2 + n_static)]
+    if input_layout == SPLIT_LAYOUT:
+        return [(timesteps, 2), (n_static,)]
+    raise ValueError('Unknown input layout {}'.format(input_layout))
+
+
+def model_feed(inputs):
+    # Single input models are fed the array itself, multi input models a tuple of arrays which tf.data can nest
+    return inputs[0] if len(inputs) == 1 else tuple(inputs)
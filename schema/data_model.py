@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, VARCHAR, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, VARCHAR, Float, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 
 import datetime
@@ -17,10 +17,12 @@ class Symbols(Base):
     industry = Column('industry', Text)
     market_type = Column('market_type', Text)
     date_updated = Column('date_updated', DateTime, nullable=False, default=datetime.datetime.utcnow())
+    content_hash = Column('content_hash', VARCHAR(length=40))
 
 
 class StockPrices(Base):
     __tablename__ = 'fact_stock_prices'
+    __table_args__ = (UniqueConstraint('symbol', 'stock_datetime', name='symbol_date_unique'),)
     record_id = Column('record_id', Integer, nullable=False, primary_key=True, autoincrement=True)
     symbol = Column('symbol', VARCHAR(length=20), ForeignKey('dim_symbols.symbol'), nullable=False)
     stock_datetime = Column('stock_datetime', DateTime, nullable=False)
@@ -45,9 +47,12 @@ class Models(Base):
     created_date = Column('created_date', DateTime, nullable=False, default=datetime.datetime.utcnow())
     min_train_date = Column('min_train_date', DateTime)
     max_train_date = Column('max_train_date', DateTime)
+    # 'repeated' or 'split', see python/rnn/windowing.py
+    input_layout = Column('input_layout', VARCHAR(length=20), nullable=False, default='repeated')
 
 class StockPrediction(Base):
     __tablename__ = 'fact_stock_prediction'
+    __table_args__ = (UniqueConstraint('model_id', 'symbol', 'stock_datetime', name='model_symbol_date_unique'),)
     dummy_id = Column('dummy_id', Integer, primary_key=True)
     created_date = Column('created_date', DateTime, nullable=False, default=datetime.datetime.utcnow())
     model_id = Column('model_id', Integer, ForeignKey('dim_models.model_id'), nullable=False)
@@ -56,6 +61,41 @@ class StockPrediction(Base):
     stock_datetime = Column('stock_datetime', DateTime, nullable=False)
     predicted_close = Column('predicted_close', Float)
 
+class EtlWatermarks(Base):
+    __tablename__ = 'etl_watermarks'
+    table_name = Column('table_name', VARCHAR(length=64), nullable=False, primary_key=True)
+    high_water_mark = Column('high_water_mark', DateTime)
+    date_updated = Column('date_updated', DateTime, nullable=False, default=datetime.datetime.utcnow())
+
+class SymbolWatermarks(Base):
+    __tablename__ = 'etl_symbol_watermarks'
+    symbol = Column('symbol', VARCHAR(length=20), ForeignKey('dim_symbols.symbol'), nullable=False, primary_key=True)
+    high_water_mark = Column('high_water_mark', DateTime, nullable=False)
+    date_updated = Column('date_updated', DateTime, nullable=False, default=datetime.datetime.utcnow())
+
+class BacktestResults(Base):
+    __tablename__ = 'fact_backtest_results'
+    result_id = Column('result_id', Integer, nullable=False, primary_key=True, autoincrement=True)
+    run_id = Column('run_id', VARCHAR(length=36), nullable=False)
+    run_datetime = Column('run_datetime', DateTime, nullable=False)
+    engine = Column('engine', VARCHAR(length=20))
+    symbol = Column('symbol', VARCHAR(length=20), ForeignKey('dim_symbols.symbol'), nullable=False)
+    model_id = Column('model_id', Integer, ForeignKey('dim_models.model_id'), nullable=False)
+    strategy = Column('strategy', VARCHAR(length=50), nullable=False)
+    params = Column('params', Text)
+    initial_cash = Column('initial_cash', Float)
+    commission = Column('commission', Float)
+    end_value = Column('end_value', Float)
+    return_perc = Column('return_perc', Float)
+    symbol_return_perc = Column('symbol_return_perc', Float)
+    sharpe_ratio = Column('sharpe_ratio', Float)
+    sortino_ratio = Column('sortino_ratio', Float)
+    max_drawdown_perc = Column('max_drawdown_perc', Float)
+    turnover = Column('turnover', Float)
+    win_rate = Column('win_rate', Float)
+    exposure_perc = Column('exposure_perc', Float)
+    trades = Column('trades', Integer)
+
 class ActualisedTable(Base):
     __tablename__ = 'tb_stock_actual_pred'
     dummy_id = Column('dummy_id', Integer, primary_key=True)
@@ -79,6 +119,7 @@ class ActualisedTable(Base):
     created_date = Column('created_date')
     min_train_date = Column('min_train_date')
     max_train_date = Column('max_train_date')
+    input_layout = Column('input_layout')
     symbol = Column('symbol')
     name = Column('name')
     market_cap = Column('market_cap')
@@ -8,7 +8,8 @@ CREATE TABLE IF NOT EXISTS STOCK_DB.DIM_SYMBOLS (
     SECTOR TEXT,
     INDUSTRY TEXT,
     MARKET_TYPE TEXT,
-    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW())
+    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW()),
+    CONTENT_HASH VARCHAR(40)
 );
 
 -- CREATE INDEX ON SYMBOL
@@ -23,12 +24,10 @@ CREATE TABLE IF NOT EXISTS STOCK_DB.FACT_STOCK_PRICES (
     CLOSE DOUBLE,
     ADJ_CLOSE DOUBLE,
     VOLUME DOUBLE,
-    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL)
+    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL),
+    UNIQUE KEY symbol_date_unique (SYMBOL, STOCK_DATETIME)
 );
 
--- CREATE SYMBOL INDEX ON FACT STOCK PRICES
-CREATE INDEX symbol_date_index ON STOCK_DB.FACT_STOCK_PRICES (SYMBOL, stock_datetime);
-
 -- CREATE TABLE DIM_MODELS
 CREATE TABLE IF NOT EXISTS STOCK_DB.DIM_MODELS (
     MODEL_ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
@@ -40,7 +39,8 @@ CREATE TABLE IF NOT EXISTS STOCK_DB.DIM_MODELS (
     LAYERS INT,
     CREATED_DATE DATETIME NOT NULL DEFAULT (NOW()),
     MIN_TRAIN_DATE DATETIME,
-    MAX_TRAIN_DATE DATETIME
+    MAX_TRAIN_DATE DATETIME,
+    INPUT_LAYOUT VARCHAR(20) NOT NULL DEFAULT 'repeated'
 );
 
 -- CREATE MODEL ID INDEX FOR DIM_MODELS
@@ -55,13 +55,63 @@ CREATE TABLE IF NOT EXISTS STOCK_DB.FACT_STOCK_PREDICTION (
     PREDICTION_DATETIME DATETIME NOT NULL,
     STOCK_DATETIME DATETIME NOT NULL,
     PREDICTED_CLOSE DOUBLE,
-    FOREIGN KEY (MODEL_ID) REFERENCES STOCK_DB.DIM_MODELS(MODEL_ID)
+    FOREIGN KEY (MODEL_ID) REFERENCES STOCK_DB.DIM_MODELS(MODEL_ID),
+    UNIQUE KEY model_symbol_date_unique (MODEL_ID, SYMBOL, STOCK_DATETIME)
 );
 
 -- CREATE INDEX FOR FACT_STOCK_PREDICTION
 CREATE INDEX symbol_model_date_index ON STOCK_DB.FACT_STOCK_PREDICTION (SYMBOL, MODEL_ID, stock_datetime);
 ;
 
+-- CREATE INDEXES FOR THE ACTUALISED TABLE JOIN AND ITS INCREMENTAL REFRESH
+CREATE INDEX symbol_model_prediction_date_index ON STOCK_DB.FACT_STOCK_PREDICTION (SYMBOL, MODEL_ID, PREDICTION_DATETIME);
+CREATE INDEX created_date_index ON STOCK_DB.FACT_STOCK_PREDICTION (CREATED_DATE);
+
+-- CREATE TABLE ETL_WATERMARKS, HIGH WATER MARK OF EACH INCREMENTALLY REFRESHED TABLE
+CREATE TABLE IF NOT EXISTS STOCK_DB.ETL_WATERMARKS (
+    TABLE_NAME VARCHAR(64) NOT NULL PRIMARY KEY,
+    HIGH_WATER_MARK DATETIME,
+    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW())
+);
+
+-- CREATE TABLE ETL_SYMBOL_WATERMARKS, LATEST STOCK_DATETIME LOADED INTO FACT_STOCK_PRICES FOR EACH SYMBOL
+CREATE TABLE IF NOT EXISTS STOCK_DB.ETL_SYMBOL_WATERMARKS (
+    SYMBOL VARCHAR(20) NOT NULL PRIMARY KEY,
+    HIGH_WATER_MARK DATETIME NOT NULL,
+    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW()),
+    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL)
+);
+
+-- CREATE TABLE FACT_BACKTEST_RESULTS, METRICS OF EVERY BACKTEST RUN, SEE job_back_testing.py
+CREATE TABLE IF NOT EXISTS STOCK_DB.FACT_BACKTEST_RESULTS (
+    RESULT_ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    RUN_ID VARCHAR(36) NOT NULL,
+    RUN_DATETIME DATETIME NOT NULL,
+    ENGINE VARCHAR(20),
+    SYMBOL VARCHAR(20) NOT NULL,
+    MODEL_ID INT NOT NULL,
+    STRATEGY VARCHAR(50) NOT NULL,
+    PARAMS TEXT,
+    INITIAL_CASH DOUBLE,
+    COMMISSION DOUBLE,
+    END_VALUE DOUBLE,
+    RETURN_PERC DOUBLE,
+    SYMBOL_RETURN_PERC DOUBLE,
+    SHARPE_RATIO DOUBLE,
+    SORTINO_RATIO DOUBLE,
+    MAX_DRAWDOWN_PERC DOUBLE,
+    TURNOVER DOUBLE,
+    WIN_RATE DOUBLE,
+    EXPOSURE_PERC DOUBLE,
+    TRADES INT,
+    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL),
+    FOREIGN KEY (MODEL_ID) REFERENCES STOCK_DB.DIM_MODELS(MODEL_ID)
+);
+
+-- CREATE INDEXES TO RANK THE RUNS OF A SWEEP AND OF A SYMBOL/MODEL
+CREATE INDEX run_id_index ON STOCK_DB.FACT_BACKTEST_RESULTS (RUN_ID);
+CREATE INDEX symbol_model_strategy_index ON STOCK_DB.FACT_BACKTEST_RESULTS (SYMBOL, MODEL_ID, STRATEGY);
+
 -- ACTUALISE JOIN RESULLTS FOR TABLEAU OPTIMISATION
 CREATE TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED AS
 SELECT
@@ -75,7 +125,15 @@ FACT_STOCK_PRICES.STOCK_DATETIME
 , fact_stock_prediction.PREDICTED_CLOSE -- Close from prediction joined on the actual stock date, used for validation
 , pred.predicted_close future_close -- Close from prediction joined on the date predictions were made, used for backtesting
 , DIM_MODELS.*
-, DIM_SYMBOLS.*
+, DIM_SYMBOLS.SYMBOL
+, DIM_SYMBOLS.NAME
+, DIM_SYMBOLS.MARKET_CAP
+, DIM_SYMBOLS.COUNTRY
+, DIM_SYMBOLS.IPO_YEAR
+, DIM_SYMBOLS.SECTOR
+, DIM_SYMBOLS.INDUSTRY
+, DIM_SYMBOLS.MARKET_TYPE
+, DIM_SYMBOLS.DATE_UPDATED -- CONTENT_HASH is load bookkeeping for job_ingest_stock_symbols.py, not copied
 from fact_stock_prices
 inner join fact_stock_prediction on fact_stock_prices.stock_datetime = fact_stock_prediction.STOCK_DATETIME
 	and fact_stock_prices.symbol = fact_stock_prediction.symbol
@@ -85,3 +143,6 @@ inner join fact_stock_prediction pred on fact_stock_prediction.stock_datetime =
 inner join dim_models on dim_models.model_id = fact_stock_prediction.model_id
 inner join dim_symbols on dim_symbols.symbol = fact_stock_prices.SYMBOL
 ;
+
+-- CREATE UNIQUE KEY USED TO MERGE NEW ROWS INTO THE ACTUALISED TABLE, SEE job_refresh_actualised_table.py
+ALTER TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED ADD UNIQUE KEY symbol_model_date_unique (SYMBOL, MODEL_ID, STOCK_DATETIME);
@@ -0,0 +1,23 @@
+-- ADD UNIQUE (MODEL_ID, SYMBOL, STOCK_DATETIME) KEY TO FACT_STOCK_PREDICTION
+-- Existing duplicates are collapsed into a single row per key before the tables are swapped
+CREATE TABLE STOCK_DB.FACT_STOCK_PREDICTION_DEDUP LIKE STOCK_DB.FACT_STOCK_PREDICTION;
+
+ALTER TABLE STOCK_DB.FACT_STOCK_PREDICTION_DEDUP
+    ADD UNIQUE KEY model_symbol_date_unique (MODEL_ID, SYMBOL, STOCK_DATETIME);
+
+INSERT INTO STOCK_DB.FACT_STOCK_PREDICTION_DEDUP
+SELECT * FROM STOCK_DB.FACT_STOCK_PREDICTION ORDER BY CREATED_DATE
+ON DUPLICATE KEY UPDATE
+    CREATED_DATE = VALUES(CREATED_DATE)
+    , PREDICTION_DATETIME = VALUES(PREDICTION_DATETIME)
+    , PREDICTED_CLOSE = VALUES(PREDICTED_CLOSE)
+;
+
+RENAME TABLE STOCK_DB.FACT_STOCK_PREDICTION TO STOCK_DB.FACT_STOCK_PREDICTION_OLD,
+    STOCK_DB.FACT_STOCK_PREDICTION_DEDUP TO STOCK_DB.FACT_STOCK_PREDICTION;
+
+-- CREATE TABLE ... LIKE does not copy foreign keys
+ALTER TABLE STOCK_DB.FACT_STOCK_PREDICTION
+    ADD FOREIGN KEY (MODEL_ID) REFERENCES STOCK_DB.DIM_MODELS(MODEL_ID);
+
+DROP TABLE STOCK_DB.FACT_STOCK_PREDICTION_OLD;
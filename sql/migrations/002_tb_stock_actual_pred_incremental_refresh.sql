@@ -0,0 +1,21 @@
+-- INDEXES AND WATERMARK TABLE FOR THE INCREMENTAL REFRESH OF TB_STOCK_ACTUAL_PRED
+CREATE INDEX symbol_model_prediction_date_index ON STOCK_DB.FACT_STOCK_PREDICTION (SYMBOL, MODEL_ID, PREDICTION_DATETIME);
+CREATE INDEX created_date_index ON STOCK_DB.FACT_STOCK_PREDICTION (CREATED_DATE);
+
+CREATE TABLE IF NOT EXISTS STOCK_DB.ETL_WATERMARKS (
+    TABLE_NAME VARCHAR(64) NOT NULL PRIMARY KEY,
+    HIGH_WATER_MARK DATETIME,
+    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW())
+);
+
+-- Remove any duplicate rows left by earlier full rebuilds before adding the merge key
+CREATE TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED_DEDUP LIKE STOCK_DB.TB_STOCK_ACTUAL_PRED;
+
+ALTER TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED_DEDUP ADD UNIQUE KEY symbol_model_date_unique (SYMBOL, MODEL_ID, STOCK_DATETIME);
+
+INSERT IGNORE INTO STOCK_DB.TB_STOCK_ACTUAL_PRED_DEDUP SELECT * FROM STOCK_DB.TB_STOCK_ACTUAL_PRED;
+
+RENAME TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED TO STOCK_DB.TB_STOCK_ACTUAL_PRED_OLD,
+    STOCK_DB.TB_STOCK_ACTUAL_PRED_DEDUP TO STOCK_DB.TB_STOCK_ACTUAL_PRED;
+
+DROP TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED_OLD;
@@ -0,0 +1,29 @@
+-- CREATE TABLE FACT_BACKTEST_RESULTS, METRICS OF EVERY BACKTEST RUN, SEE job_back_testing.py
+CREATE TABLE IF NOT EXISTS STOCK_DB.FACT_BACKTEST_RESULTS (
+    RESULT_ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    RUN_ID VARCHAR(36) NOT NULL,
+    RUN_DATETIME DATETIME NOT NULL,
+    ENGINE VARCHAR(20),
+    SYMBOL VARCHAR(20) NOT NULL,
+    MODEL_ID INT NOT NULL,
+    STRATEGY VARCHAR(50) NOT NULL,
+    PARAMS TEXT,
+    INITIAL_CASH DOUBLE,
+    COMMISSION DOUBLE,
+    END_VALUE DOUBLE,
+    RETURN_PERC DOUBLE,
+    SYMBOL_RETURN_PERC DOUBLE,
+    SHARPE_RATIO DOUBLE,
+    SORTINO_RATIO DOUBLE,
+    MAX_DRAWDOWN_PERC DOUBLE,
+    TURNOVER DOUBLE,
+    WIN_RATE DOUBLE,
+    EXPOSURE_PERC DOUBLE,
+    TRADES INT,
+    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL),
+    FOREIGN KEY (MODEL_ID) REFERENCES STOCK_DB.DIM_MODELS(MODEL_ID)
+);
+
+-- CREATE INDEXES TO RANK THE RUNS OF A SWEEP AND OF A SYMBOL/MODEL
+CREATE INDEX run_id_index ON STOCK_DB.FACT_BACKTEST_RESULTS (RUN_ID);
+CREATE INDEX symbol_model_strategy_index ON STOCK_DB.FACT_BACKTEST_RESULTS (SYMBOL, MODEL_ID, STRATEGY);
@@ -0,0 +1,9 @@
+-- ADD INPUT_LAYOUT TO DIM_MODELS, WHETHER A MODEL TAKES THE STATIC FEATURES REPEATED ON EVERY TIMESTEP ('repeated')
+-- OR AS A SEPARATE INPUT ('split'). Existing models were all trained on the repeated layout
+ALTER TABLE STOCK_DB.DIM_MODELS
+    ADD COLUMN INPUT_LAYOUT VARCHAR(20) NOT NULL DEFAULT 'repeated';
+
+-- TB_STOCK_ACTUAL_PRED was created with DIM_MODELS.*, the column goes after the other DIM_MODELS columns so the
+-- actualised table keeps the column order of the select in job_refresh_actualised_table.py
+ALTER TABLE STOCK_DB.TB_STOCK_ACTUAL_PRED
+    ADD COLUMN INPUT_LAYOUT VARCHAR(20) NOT NULL DEFAULT 'repeated' AFTER MAX_TRAIN_DATE;
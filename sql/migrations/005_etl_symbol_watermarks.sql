@@ -0,0 +1,16 @@
+-- CREATE TABLE ETL_SYMBOL_WATERMARKS, LATEST STOCK_DATETIME LOADED INTO FACT_STOCK_PRICES FOR EACH SYMBOL, SEE
+-- job_ingest_stock_prices.py
+CREATE TABLE IF NOT EXISTS STOCK_DB.ETL_SYMBOL_WATERMARKS (
+    SYMBOL VARCHAR(20) NOT NULL PRIMARY KEY,
+    HIGH_WATER_MARK DATETIME NOT NULL,
+    DATE_UPDATED DATETIME NOT NULL DEFAULT (NOW()),
+    FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL)
+);
+
+-- Start every symbol from the prices already loaded
+INSERT INTO STOCK_DB.ETL_SYMBOL_WATERMARKS (SYMBOL, HIGH_WATER_MARK, DATE_UPDATED)
+SELECT SYMBOL, MAX(STOCK_DATETIME), NOW() FROM STOCK_DB.FACT_STOCK_PRICES GROUP BY SYMBOL
+ON DUPLICATE KEY UPDATE
+    HIGH_WATER_MARK = GREATEST(HIGH_WATER_MARK, VALUES(HIGH_WATER_MARK))
+    , DATE_UPDATED = VALUES(DATE_UPDATED)
+;
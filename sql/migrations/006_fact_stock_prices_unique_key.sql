@@ -0,0 +1,27 @@
+-- ADD UNIQUE (SYMBOL, STOCK_DATETIME) KEY TO FACT_STOCK_PRICES, REPLACING THE NON UNIQUE SYMBOL_DATE_INDEX
+-- Existing duplicates are collapsed into the latest loaded row per key before the tables are swapped
+CREATE TABLE STOCK_DB.FACT_STOCK_PRICES_DEDUP LIKE STOCK_DB.FACT_STOCK_PRICES;
+
+ALTER TABLE STOCK_DB.FACT_STOCK_PRICES_DEDUP
+    DROP INDEX symbol_date_index,
+    ADD UNIQUE KEY symbol_date_unique (SYMBOL, STOCK_DATETIME);
+
+INSERT INTO STOCK_DB.FACT_STOCK_PRICES_DEDUP
+SELECT * FROM STOCK_DB.FACT_STOCK_PRICES ORDER BY RECORD_ID
+ON DUPLICATE KEY UPDATE
+    OPEN = VALUES(OPEN)
+    , HIGH = VALUES(HIGH)
+    , LOW = VALUES(LOW)
+    , CLOSE = VALUES(CLOSE)
+    , ADJ_CLOSE = VALUES(ADJ_CLOSE)
+    , VOLUME = VALUES(VOLUME)
+;
+
+RENAME TABLE STOCK_DB.FACT_STOCK_PRICES TO STOCK_DB.FACT_STOCK_PRICES_OLD,
+    STOCK_DB.FACT_STOCK_PRICES_DEDUP TO STOCK_DB.FACT_STOCK_PRICES;
+
+-- CREATE TABLE ... LIKE does not copy foreign keys
+ALTER TABLE STOCK_DB.FACT_STOCK_PRICES
+    ADD FOREIGN KEY (SYMBOL) REFERENCES STOCK_DB.DIM_SYMBOLS(SYMBOL);
+
+DROP TABLE STOCK_DB.FACT_STOCK_PRICES_OLD;
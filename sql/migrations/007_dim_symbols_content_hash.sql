@@ -0,0 +1,7 @@
+-- ADD CONTENT_HASH TO DIM_SYMBOLS, SHA1 OF THE SYMBOL ATTRIBUTES AS OF THE LAST LOAD SO UNCHANGED SYMBOLS ARE SKIPPED.
+-- Existing symbols have no hash and are written once more on the next run of job_ingest_stock_symbols.py
+ALTER TABLE STOCK_DB.DIM_SYMBOLS
+    ADD COLUMN CONTENT_HASH VARCHAR(40);
+
+-- TB_STOCK_ACTUAL_PRED is not altered, job_refresh_actualised_table.py merges an explicit column list without
+-- CONTENT_HASH
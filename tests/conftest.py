@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules import each other both as python.x.y from the repository root and as x.y from python/, where the jobs run
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, 'python')]
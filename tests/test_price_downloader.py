@@ -0,0 +1,53 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from python.ingestion.price_downloader import ChunkedDownloader
+from python.ingestion.stock_data_transformer import PRICE_FIELDS
+
+
+class FlakyProvider:
+    '''
+    Prices in the yf.download format, the columns of the failing tickers come back as NaN on their first fail_times
+    downloads, as yf.download does for a ticker it failed on.
+    '''
+
+    def __init__(self, failing, fail_times):
+        self.failing = failing
+        self.fail_times = fail_times
+        self.downloads = Counter()
+
+    def download(self, tickers, start, end=None):
+        self.downloads.update(tickers)
+        index = pd.bdate_range(start, periods=5, name='Date')
+        data = pd.DataFrame(1.0, index=index, columns=pd.MultiIndex.from_product([PRICE_FIELDS, tickers]))
+        for ticker in tickers:
+            if ticker in self.failing and self.downloads[ticker] <= self.fail_times:
+                data.loc[:, pd.IndexSlice[:, ticker]] = np.nan
+        return data
+
+
+def download(provider, tickers, max_retries=2):
+    downloader = ChunkedDownloader(provider, chunk_size=3, max_workers=2, max_retries=max_retries, backoff_seconds=0)
+    data = list(downloader.iter_chunks(tickers, '2021-01-01'))
+    return data, downloader.failed_tickers
+
+
+def test_nan_ticker_is_retried_on_its_own():
+    provider = FlakyProvider(failing={'B'}, fail_times=1)
+    data, failed_tickers = download(provider, ['A', 'B', 'C'])
+
+    assert failed_tickers == []
+    assert provider.downloads == {'A': 1, 'B': 2, 'C': 1}
+    assert sorted(data[0]['Close'].columns) == ['A', 'B', 'C']
+    assert not data[0].isna().any().any()
+
+
+def test_ticker_without_prices_is_reported():
+    provider = FlakyProvider(failing={'B', 'D'}, fail_times=10)
+    data, failed_tickers = download(provider, ['A', 'B', 'C', 'D'])
+
+    assert sorted(failed_tickers) == ['B', 'D']
+    assert provider.downloads['B'] == provider.downloads['D'] == 3
+    assert sorted(ticker for chunk in data for ticker in chunk['Close'].columns) == ['A', 'C']
@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from python.rnn.grid_scheduler import _fit_and_save
+from python.rnn.model_builder import load_trained_model
+from python.rnn.tflite_export import TFLITE_FILE, TFLiteModel
+
+EXPORT_CONFIG = {'FORMAT': 'tflite', 'BATCH_SIZE': 16, 'QUANTIZATION': None, 'PARITY_TOLERANCE': 1e-4,
+                 'PARITY_SAMPLES': 40}
+
+
+@pytest.mark.parametrize('input_shapes', [[(5, 3)], [(5, 2), (4,)]], ids=['repeated', 'split'])
+def test_trained_model_saves_and_exports(tmp_path, input_shapes):
+    # A grid entry is saved and exported as the trainer does, then served from both the Keras and TFLite artifacts
+    rng = np.random.default_rng(0)
+    inputs = [rng.random((50,) + shape, dtype=np.float32) for shape in input_shapes]
+    dataset = tuple(inputs) + (rng.random(50, dtype=np.float32),)
+
+    tmp_dir = _fit_and_save(dataset, (5, 1, 1, 0.1, 2, 16), str(tmp_path), EXPORT_CONFIG)
+
+    assert os.path.exists(os.path.join(tmp_dir, TFLITE_FILE))
+    model = load_trained_model(tmp_dir)
+    tflite_model = TFLiteModel(os.path.join(tmp_dir, TFLITE_FILE))
+    assert tflite_model.input_shapes == input_shapes
+
+    feed = inputs[0] if len(inputs) == 1 else inputs
+    np.testing.assert_allclose(tflite_model.predict(feed), model.predict(feed, verbose=0), atol=1e-4)
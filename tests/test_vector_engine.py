@@ -0,0 +1,54 @@
+import logging
+
+import numpy as np
+import pytest
+
+from backtesting.custom_datafeed import PandasData
+from backtesting.runner import get_equity_curve, run_backtest
+from backtesting.vector_engine import VECTOR_STRATEGIES, run_vector_backtest
+from benchmarks.benchmark_vector_backtest import make_actualised_data
+
+INITIAL_CASH = 10000
+
+# Strategy params of configurations/run_config.json, with a second set of periods and sizes per strategy
+STRATEGY_PARAMS = {
+    'FollowTheTrendMA': [
+        dict(maperiod=10, maperiod2=20, stdev=2, buy_perc=0.7, sell_perc=0.5),
+        dict(maperiod=5, maperiod2=30, stdev=2, buy_perc=0.5, sell_perc=0.7)
+    ],
+    'FollowTheTrendBollinger': [
+        dict(maperiod=14, stdev=2, buy_perc=0.7, sell_perc=0.5),
+        dict(maperiod=20, stdev=1.5, buy_perc=0.5, sell_perc=0.7)
+    ],
+    'MeanReversionMinMax': [
+        dict(maperiod=10, stdev=2, buy_perc=0.7, sell_perc=0.5),
+        dict(maperiod=20, stdev=2, buy_perc=0.5, sell_perc=0.7)
+    ],
+    'MeanReversionBollinger': [
+        dict(maperiod=14, stdev=2, buy_perc=0.5, sell_perc=0.5),
+        dict(maperiod=10, stdev=1.5, buy_perc=0.7, sell_perc=0.7)
+    ]
+}
+
+
+def test_every_strategy_is_covered():
+    assert set(STRATEGY_PARAMS) == set(VECTOR_STRATEGIES)
+
+
+@pytest.mark.parametrize('strategy_name, params', [
+    (strategy_name, params) for strategy_name, param_list in STRATEGY_PARAMS.items() for params in param_list])
+@pytest.mark.parametrize('commission', [0.0, 0.001])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_vector_backtest_matches_backtrader(strategy_name, params, commission, seed):
+    data = make_actualised_data(300, seed)
+
+    cerebro, expected = run_backtest(PandasData(dataname=data), strategy_name, params, INITIAL_CASH, commission,
+                                     stdstats=False, log_level=logging.WARNING)
+    result, values = run_vector_backtest(data, strategy_name, params, INITIAL_CASH, commission)
+
+    # Same portfolio value to the cent on every bar, and the same metrics
+    assert abs(result['end_value'] - expected['end_value']) < 0.005
+    np.testing.assert_allclose(values, get_equity_curve(cerebro)['portfolio'].to_numpy(), rtol=0, atol=0.005)
+    assert result.keys() == expected.keys()
+    for metric, value in expected.items():
+        assert result[metric] == pytest.approx(value, rel=1e-9, abs=1e-9, nan_ok=True), metric
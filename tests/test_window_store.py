@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('keras')
+
+from python.rnn.window_store import WindowSequence
+
+
+def epoch_targets(sequence):
+    return [sequence[index][1] for index in range(len(sequence))]
+
+
+def test_shuffled_batches_draw_samples_across_the_training_set():
+    # Targets are the sample indices, so every batch shows which samples it was drawn from
+    y = np.arange(100, dtype=np.float32)
+    X = np.repeat(y[:, None, None], 3, axis=1)
+    sequence = WindowSequence([X], y, batch_size=16, seed=0)
+
+    first_epoch = epoch_targets(sequence)
+    for batch in first_epoch:
+        assert np.all(np.diff(batch) > 0)
+    assert any(batch[-1] - batch[0] >= len(batch) for batch in first_epoch)
+    np.testing.assert_array_equal(np.sort(np.concatenate(first_epoch)), y)
+
+    batch_X, batch_y = sequence[0]
+    np.testing.assert_array_equal(batch_X[:, 0, 0], batch_y)
+
+    sequence.on_epoch_end()
+    second_epoch = epoch_targets(sequence)
+    np.testing.assert_array_equal(np.sort(np.concatenate(second_epoch)), y)
+    assert not np.array_equal(np.concatenate(first_epoch), np.concatenate(second_epoch))
+
+
+def test_unshuffled_batches_are_contiguous():
+    y = np.arange(10, dtype=np.float32)
+    sequence = WindowSequence([y[:, None, None]], y, batch_size=4, shuffle=False)
+    np.testing.assert_array_equal(np.concatenate(epoch_targets(sequence)), y)
+    assert len(sequence) == 3
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from python.rnn.windowing import build_windows, build_targets
+
+
+def build_windows_per_sample(scaled_close, scaled_volume, static_features, timesteps, predict_gap):
+    # Original per sample loop of job_rnn_model_trainer.py, before windowing was vectorised
+    non_numeric_features = []
+    for row in static_features:
+        row_l = []
+        for col in row:
+            row_l.append([col] * timesteps)
+        non_numeric_features.append(row_l)
+
+    X_train = []
+    y_train = []
+    for i in range(timesteps + predict_gap, scaled_close.shape[0]):
+        X_train.append(
+            [scaled_close[i - timesteps - predict_gap:i - predict_gap, 0],
+             scaled_volume[i - timesteps - predict_gap:i - predict_gap, 0]
+             ] + non_numeric_features[i]
+        )
+        y_train.append(scaled_close[i, 0])
+
+    X_train, y_train = np.array(X_train), np.array(y_train)
+    X_train = np.array(X_train).transpose((0, 2, 1))
+    return X_train, y_train
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    n_rows = 40
+    scaled_close = rng.random((n_rows, 1))
+    scaled_volume = rng.random((n_rows, 1))
+    static_features = rng.integers(0, 2, size=(n_rows, 3)).astype(np.uint8)
+    return scaled_close, scaled_volume, static_features
+
+
+@pytest.mark.parametrize('timesteps, predict_gap', [(5, 1), (10, 3), (1, 0), (30, 5)])
+def test_build_windows_matches_per_sample_loop(series, timesteps, predict_gap):
+    scaled_close, scaled_volume, static_features = series
+    expected_X, expected_y = build_windows_per_sample(
+        scaled_close, scaled_volume, static_features, timesteps, predict_gap)
+
+    X = build_windows(scaled_close, scaled_volume, static_features, timesteps, predict_gap)
+    y = build_targets(scaled_close, timesteps, predict_gap)
+
+    assert X.shape == expected_X.shape
+    assert X.dtype == expected_X.dtype
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+@pytest.mark.parametrize('timesteps, predict_gap', [(5, 1), (10, 3)])
+def test_build_windows_views_match_per_sample_loop(series, timesteps, predict_gap):
+    scaled_close, scaled_volume, static_features = series
+    expected_X, _ = build_windows_per_sample(scaled_close, scaled_volume, static_features, timesteps, predict_gap)
+
+    sequence, static = build_windows(
+        scaled_close, scaled_volume, static_features, timesteps, predict_gap, as_view=True)
+
+    np.testing.assert_array_equal(sequence, expected_X[:, :, :2])
+    np.testing.assert_array_equal(static, expected_X[:, :, 2:])
+
+
+def test_build_windows_shorter_than_window(series):
+    scaled_close, scaled_volume, static_features = series
+    X = build_windows(scaled_close[:4], scaled_volume[:4], static_features[:4], 5, 1)
+    assert X.shape == (0, 5, 5)
+    assert len(build_targets(scaled_close[:4], 5, 1)) == 0